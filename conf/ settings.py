@@ -35,6 +35,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'src.timing.ServerTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -133,16 +134,86 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication'],
+        'users.authentication.RoleClaimsJWTAuthentication'],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated']
 }
 
+# Общий кэш процессов (Redis), например redis://127.0.0.1:6379/0. Без него используется кэш в памяти процесса,
+# который не сбрасывается в других процессах
+REDIS_URL = env.str("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+
+# Подсчет общего количества объектов в пагинаторах: exact, cached или estimate.
+# Способ cached работает только с временем кэширования больше 0, иначе выполняется COUNT(*). По умолчанию
+# время задано только с общим кэшем REDIS_URL, чтобы сброс при создании и удалении объектов доходил до всех процессов
+PAGINATION_COUNT_STRATEGY = env.str("PAGINATION_COUNT_STRATEGY", "exact")
+PAGINATION_COUNT_CACHE_TTL = env.int("PAGINATION_COUNT_CACHE_TTL", 60 if REDIS_URL else 0)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = env.int("PAGINATION_COUNT_ESTIMATE_THRESHOLD", 100000)
+
+# Быстрый вывод списков уроков, подписок и платежей через values() без создания экземпляров модели
+FAST_LIST_SERIALIZATION = env.bool("FAST_LIST_SERIALIZATION", False)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=180),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1)}
 
+# Проверять роли пользователя по БД, не доверяя claims JWT
+JWT_ROLE_CLAIMS_DB_CHECK = env.bool("JWT_ROLE_CLAIMS_DB_CHECK", False)
+
+# Время кэширования пользователя при аутентификации по JWT (0 - без кэша).
+# По умолчанию кэш включен только с общим кэшем REDIS_URL, чтобы сброс при изменении пользователя
+# доходил до всех процессов
+AUTH_USER_CACHE_TTL = env.int("AUTH_USER_CACHE_TTL", 300 if REDIS_URL else 0)
+
 STRIPE_API_KEY = env.str("STRIPE_API_KEY")
+STRIPE_WEBHOOK_SECRET = env.str("STRIPE_WEBHOOK_SECRET", "")
+# Адрес API stripe, например локальной замены из команды run_fake_stripe (пусто - api.stripe.com)
+STRIPE_API_BASE = env.str("STRIPE_API_BASE", "")
+
+# Клиент stripe: пул соединений, таймауты (сек), повторы с паузой (сек) и размыкатель цепи
+STRIPE_POOL_SIZE = env.int("STRIPE_POOL_SIZE", 10)
+STRIPE_CONNECT_TIMEOUT = env.float("STRIPE_CONNECT_TIMEOUT", 3)
+STRIPE_READ_TIMEOUT = env.float("STRIPE_READ_TIMEOUT", 10)
+STRIPE_MAX_RETRIES = env.int("STRIPE_MAX_RETRIES", 2)
+STRIPE_RETRY_BASE_DELAY = env.float("STRIPE_RETRY_BASE_DELAY", 0.25)
+STRIPE_RETRY_MAX_DELAY = env.float("STRIPE_RETRY_MAX_DELAY", 2)
+STRIPE_BREAKER_FAILURES = env.int("STRIPE_BREAKER_FAILURES", 5)
+STRIPE_BREAKER_RESET_TIMEOUT = env.float("STRIPE_BREAKER_RESET_TIMEOUT", 30)
+
+# Время кэширования ID цены stripe для курса или урока и суммы (0 - без кэша, цена берется из таблицы StripePrice).
+# По умолчанию кэш включен только с общим кэшем REDIS_URL, чтобы сброс при переименовании доходил до всех процессов
+STRIPE_PRICE_CACHE_TTL = env.int("STRIPE_PRICE_CACHE_TTL", 3600 if REDIS_URL else 0)
+
+# Создание сессии оплаты: sync - в запросе, thread - в пуле потоков процесса, db - командой process_pending_payments
+PAYMENT_CHECKOUT_MODE = env.str("PAYMENT_CHECKOUT_MODE", "sync")
+PAYMENT_CHECKOUT_WORKERS = env.int("PAYMENT_CHECKOUT_WORKERS", 4)
+# Повторный захват платежа, оставшегося в статусе processing дольше этого времени (обработчик упал), сек
+PAYMENT_CHECKOUT_CLAIM_TIMEOUT = env.int("PAYMENT_CHECKOUT_CLAIM_TIMEOUT", 300)
+# Наибольшее ожидание ссылки на оплату в запросе статуса, сек. В синхронном представлении ожидание занимает
+# обработчик WSGI, поэтому по умолчанию отключено; долгий опрос - через асинхронное представление под ASGI
+PAYMENT_STATUS_MAX_WAIT = env.float("PAYMENT_STATUS_MAX_WAIT", 0)
+PAYMENT_STATUS_ASYNC_MAX_WAIT = env.float("PAYMENT_STATUS_ASYNC_MAX_WAIT", 30)
+
+# Количество последних платежей в истории на странице пользователя (остальные - по ссылке payments_history_next),
+# 0 - история не выводится
+USER_PAYMENT_HISTORY_SIZE = env.int("USER_PAYMENT_HISTORY_SIZE", 10)
+
+# Замеры запросов (заголовок Server-Timing и лог src.timing): доля замеряемых запросов (0 - выключено),
+# вывод заголовка и пороги записи в лог с уровнем WARNING (время ответа, мс, и количество запросов к БД)
+SERVER_TIMING_SAMPLE_RATE = env.float("SERVER_TIMING_SAMPLE_RATE", 1.0)
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", True)
+SERVER_TIMING_SLOW_MS = env.float("SERVER_TIMING_SLOW_MS", 500)
+SERVER_TIMING_SLOW_QUERIES = env.int("SERVER_TIMING_SLOW_QUERIES", 50)
+
+# Время хранения ключей идемпотентности (заголовок Idempotency-Key), сек
+IDEMPOTENCY_KEY_TTL = env.int("IDEMPOTENCY_KEY_TTL", 86400)
 
 
 SWAGGER_SETTINGS = {
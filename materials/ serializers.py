@@ -1,48 +1,114 @@
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
+from src.fieldsets import SparseFieldsMixin
+from src.timing import TimedSerializerMixin
+from src.utils import invalidate_stripe_prices
+
+from .counters import rebuild_course_counters
 from .models import Course, Lesson, Subscription, Payment
 from .validators import YoutubeLinkValidator
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonBulkListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор для массового создания и обновления объектов Lesson.
+    Для обновления instance - словарь {id: урок}, каждый элемент данных должен содержать id
+    """
+
+    def get_instance(self, data):
+        try:
+            return self.instance.get(int(data.get("id")))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def run_child_validation(self, data):
+        """
+        Урок элемента передается сериализатору только на время проверки этого элемента,
+        данные элемента не сохраняются в общем сериализаторе и не видны при проверке следующих
+        """
+        if self.instance is None:
+            return super().run_child_validation(data)
+        instance = self.get_instance(data)
+        if instance is None:
+            raise ValidationError({"id": ["Урок не найден или недоступен"]})
+        self.child.instance = instance
+        try:
+            return super().run_child_validation(data)
+        finally:
+            self.child.instance = None
+
+    def create(self, validated_data):
+        lessons = Lesson.objects.bulk_create(Lesson(**attrs) for attrs in validated_data)
+        rebuild_course_counters(Course.objects.filter(pk__in={lesson.course_id for lesson in lessons}))
+        return lessons
+
+    def update(self, instance, validated_data):
+        lessons = []
+        renamed = []
+        fields = set()
+        course_ids = set()
+        updated_at = timezone.now()
+        for data, attrs in zip(self.initial_data, validated_data):
+            lesson = self.get_instance(data)
+            course_ids.add(lesson.course_id)
+            if "name" in attrs and lesson.name != attrs["name"]:
+                renamed.append(lesson)
+            for field, value in attrs.items():
+                setattr(lesson, field, value)
+            lesson.updated_at = updated_at
+            fields.update(attrs)
+            course_ids.add(lesson.course_id)
+            lessons.append(lesson)
+        if fields:
+            Lesson.objects.bulk_update(lessons, fields | {"updated_at"})
+        if "course" in fields:
+            rebuild_course_counters(Course.objects.filter(pk__in=course_ids))
+        # bulk_update не отправляет post_save, поэтому цены stripe переименованных уроков сбрасываются здесь
+        if renamed:
+            invalidate_stripe_prices(lesson__in=renamed)
+        return lessons
+
+
+class LessonSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         validators = [YoutubeLinkValidator(field="video_link")]
         model = Lesson
-        fields = "__all__"
+        exclude = ["updated_at"]
+        list_serializer_class = LessonBulkListSerializer
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Subscription
-        fields = "__all__"
+        exclude = ["updated_at"]
 
 
-class CourseSerializer(serializers.ModelSerializer):
-    lessons_count = serializers.SerializerMethodField()
+class CourseSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     course_lessons = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
-        fields = "__all__"
-
-    def get_lessons_count(self, obj):
-        """
-        Подсчет количества уроков в курсе
-        """
-        return Lesson.objects.filter(course=obj).count()
+        exclude = ["updated_at"]
+        read_only_fields = ("lessons_count", "subscriptions_count", "paid_payments_count")
 
     def get_course_lessons(self, obj):
         """
-        Список уроков в курсе
+        Список уроков в курсе (использует prefetch_related, если он был выполнен)
         """
-        return [lesson.id for lesson in Lesson.objects.filter(course=obj)]
+        return [lesson.id for lesson in obj.lessons.all()]
 
     def get_is_subscribed(self, obj):
         """
-        Проверка, подписан ли пользователь на курс
+        Проверка, подписан ли пользователь на курс (берется из аннотации queryset, если она есть)
         """
-        if Subscription.objects.filter(owner=self.context["request"].user, course=obj).exists():
+        if hasattr(obj, "is_subscribed"):
+            is_subscribed = obj.is_subscribed
+        else:
+            is_subscribed = Subscription.objects.filter(owner=self.context["request"].user, course=obj).exists()
+        if is_subscribed:
             return "Вы подписаны"
         else:
             return "Вы еще не подписаны"
@@ -52,15 +118,24 @@ class StaffCourseSerializer(CourseSerializer):
     """
     Сериализатор для модели Course, отображающийся модератору и админу
     """
-    lessons_count = serializers.SerializerMethodField()
     course_lessons = LessonSerializer(source="lessons", many=True, read_only=True)
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для списка объектов модели Payment
     """
 
     class Meta:
         model = Payment
-        fields = "__all__"
\ No newline at end of file
+        exclude = ["updated_at"]
+
+
+class PaymentStatusSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Сериализатор статуса создания сессии оплаты объекта модели Payment
+    """
+
+    class Meta:
+        model = Payment
+        fields = ["id", "status", "link"]
@@ -1,12 +1,29 @@
+import json
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
 from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.test import APITestCase
 
+from src.benchmarks import find_regressions, run_benchmarks
+from users.authentication import get_user_cache_stats
 from users.models import User
+from users.serializers import RoleTokenObtainPairSerializer
 
-from .models import Lesson
+from .models import Course, Lesson, Payment, StripePrice, Subscription
+from .paginators import CoursePaginator
 
 
 # Create your tests here.
@@ -58,6 +75,21 @@ class LessonTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(data.get("name"), self.lesson.name)
 
+    def test_lesson_retrieve_permission_filter(self):
+        """
+        Тест проверки прав на объект Lesson в запросе к БД без загрузки владельца
+        """
+
+        for lesson, expected_status in [(self.lesson, status.HTTP_200_OK), (self.lesson_2, status.HTTP_403_FORBIDDEN)]:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse("materials:lesson", args=[lesson.pk]))
+
+            self.assertEqual(response.status_code, expected_status)
+            self.assertFalse([query for query in context.captured_queries if 'FROM "users_user" ' in query["sql"]])
+
+        response = self.client.get(reverse("materials:lesson", args=[self.lesson_2.pk + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_lesson_create(self):
         """
         Тест создания объекта Lesson и автоматического заполнения поля owner
@@ -174,6 +206,7 @@ class LessonTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         result = {'count': 1,
+                  'count_is_exact': True,
                   'next': None,
                   'previous': None,
                   'results': [{'id': self.lesson.pk,
@@ -195,6 +228,7 @@ class LessonTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         result = {'count': 2,
+                  'count_is_exact': True,
                   'next': None,
                   'previous': None,
                   'results': [{'id': self.lesson.pk,
@@ -213,4 +247,617 @@ class LessonTestCase(APITestCase):
                                'owner': None}
                               ]}
 
-        self.assertEqual(data, result)
\ No newline at end of file
+        self.assertEqual(data, result)
+
+    def test_lesson_list_cursor(self):
+        """
+        Тест курсорной пагинации списка объектов Lesson
+        """
+
+        self.client.force_authenticate(self.moderator)
+        url = reverse("materials:lessons")
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 1})
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", data)
+        self.assertIsNone(data["previous"])
+        self.assertEqual([lesson["id"] for lesson in data["results"]], [self.lesson.pk])
+
+        response = self.client.get(data["next"])
+        data = response.json()
+
+        self.assertEqual([lesson["id"] for lesson in data["results"]], [self.lesson_2.pk])
+        self.assertIsNone(data["next"])
+
+    def test_lesson_conditional_get(self):
+        """
+        Тест ответа 304 на условный запрос объекта и списка Lesson
+        """
+
+        url = reverse("materials:lesson", args=[self.lesson.pk])
+        response = self.client.get(url)
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(any('"description"' in query["sql"] for query in context.captured_queries))
+
+        self.client.patch(url, {"name": "Новое название"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Чужой урок - права проверяются как и без условного запроса
+        url = reverse("materials:lesson", args=[self.lesson_2.pk])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        url = reverse("materials:lessons")
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        lesson = Lesson.objects.create(name="Тестовый урок 3", owner=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Last-Modified", response)
+
+        # Удаление не меняет максимальный updated_at, но меняет ETag списка
+        etag = response["ETag"]
+        lesson.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=http_date(time.time()))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_lesson_sparse_fields(self):
+        """
+        Тест вывода только запрошенных полей Lesson и загрузки только нужных колонок
+        """
+
+        url = reverse("materials:lessons")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"fields": "id,name"})
+
+        self.assertEqual(response.json()["results"], [{"id": self.lesson.pk, "name": self.lesson.name}])
+        self.assertFalse(any('"description"' in query["sql"] for query in context.captured_queries))
+
+        response = self.client.get(reverse("materials:lesson", args=[self.lesson.pk]), {"omit": "description,preview"})
+
+        self.assertEqual(set(response.json()), {"id", "name", "video_link", "course", "owner"})
+
+    def test_lesson_list_fast_path(self):
+        """
+        Тест совпадения ответа быстрого вывода списков Lesson и Subscription с выводом сериализатора
+        """
+
+        Lesson.objects.filter(pk=self.lesson.pk).update(preview="materials/courses/previews/preview.png")
+        course = Course.objects.create(name="Тестовый курс", owner=self.user)
+        Subscription.objects.create(owner=self.moderator, course=course)
+        self.client.force_authenticate(self.moderator)
+
+        requests = [(reverse("materials:lessons"), {}),
+                    (reverse("materials:lessons"), {"pagination": "cursor", "page_size": 1}),
+                    (reverse("materials:lessons"), {"fields": "id,preview,owner"}),
+                    (reverse("materials:subscriptions"), {})]
+        for url, params in requests:
+            expected = self.client.get(url, params).content
+            with override_settings(FAST_LIST_SERIALIZATION=True):
+                self.assertEqual(self.client.get(url, params).content, expected)
+
+    def test_lesson_bulk_create(self):
+        """
+        Тест массового создания объектов Lesson с проверкой ссылок на видео
+        """
+
+        url = reverse("materials:lessons-bulk")
+        data = [{"name": "Урок 3", "video_link": "https://www.youtube.com/3"},
+                {"name": "Урок 4", "video_link": "https://www.google.com/4"}]
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn("non_field_errors", response.json()[1])
+        self.assertEqual(Lesson.objects.all().count(), 2)
+
+        data[1]["video_link"] = "https://www.youtube.com/4"
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([lesson["owner"] for lesson in response.json()], [self.user.pk, self.user.pk])
+        self.assertEqual(Lesson.objects.filter(owner=self.user).count(), 3)
+        self.assertEqual(len([query for query in context.captured_queries if "INSERT" in query["sql"]]), 1)
+
+        # Модератор
+        self.client.force_authenticate(self.moderator)
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lesson_bulk_update(self):
+        """
+        Тест массового обновления объектов Lesson
+        """
+
+        url = reverse("materials:lessons-bulk")
+        data = [{"id": self.lesson.pk, "name": "Новое название"}, {"id": self.lesson_2.pk, "name": "Чужой урок"}]
+        response = self.client.patch(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", response.json()[1])
+
+        StripePrice.objects.create(lesson=self.lesson, amount=1000, currency="rub", product_id="prod_test",
+                                   price_id="price_test")
+        response = self.client.patch(url, data[:1], format="json")
+        self.lesson.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.lesson.name, "Новое название")
+        self.assertFalse(StripePrice.objects.filter(lesson=self.lesson).exists())
+
+        # Модератор
+        self.client.force_authenticate(self.moderator)
+        response = self.client.patch(url, data, format="json")
+        self.lesson_2.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.lesson_2.name, "Чужой урок")
+
+    def test_lesson_bulk_delete(self):
+        """
+        Тест массового удаления объектов Lesson
+        """
+
+        url = reverse("materials:lessons-bulk")
+        response = self.client.delete(url, {"ids": [self.lesson.pk, self.lesson_2.pk]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], [{"id": self.lesson.pk, "status": "deleted"},
+                                                      {"id": self.lesson_2.pk, "status": "not_found"}])
+        self.assertEqual(Lesson.objects.all().count(), 1)
+
+        # Модератор не удаляет чужие уроки, сотрудник (is_staff) - удаляет, как и при удалении одного урока
+        self.client.force_authenticate(self.moderator)
+        response = self.client.delete(url, {"ids": [self.lesson_2.pk]}, format="json")
+
+        self.assertEqual(response.json()["results"], [{"id": self.lesson_2.pk, "status": "not_found"}])
+
+        staff = User.objects.create(email="staff@email.com", is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.delete(url, {"ids": [self.lesson_2.pk]}, format="json")
+
+        self.assertEqual(response.json()["results"], [{"id": self.lesson_2.pk, "status": "deleted"}])
+        self.assertFalse(Lesson.objects.exists())
+
+    def test_lesson_bulk_delete_counters(self):
+        """
+        Тест пересчета счетчика курса одним запросом при массовом удалении уроков
+        """
+
+        course = Course.objects.create(name="Тестовый курс", owner=self.user)
+        lessons = [Lesson.objects.create(name=f"Урок {number}", course=course, owner=self.user) for number in range(3)]
+        Payment.objects.create(amount=1000, payment_method="cash", lesson=lessons[0], course=course, status="paid",
+                               owner=self.user)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(reverse("materials:lessons-bulk"),
+                                          {"ids": [lesson.pk for lesson in lessons[:2]]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        course.refresh_from_db()
+        self.assertEqual((course.lessons_count, course.paid_payments_count), (1, 0))
+        self.assertEqual(sum(query["sql"].startswith('UPDATE "materials_course"')
+                             for query in context.captured_queries), 1)
+
+
+class CourseTestCase(APITestCase):
+    """
+    Тестирование функционала контроллеров Course
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        self.user = User.objects.create(email="test@email.com")
+        self.moderator = User.objects.create(email="moderator@email.com")
+        group = Group.objects.create(name="Moderators")
+        self.moderator.groups.add(group)
+
+        self.course = Course.objects.create(name="Тестовый курс 1", owner=self.user)
+        self.lesson = Lesson.objects.create(name="Тестовый урок 1", course=self.course, owner=self.user)
+        Subscription.objects.create(owner=self.user, course=self.course)
+        self.client.force_authenticate(self.user)
+
+    def create_courses(self, count):
+        """
+        Создание дополнительных курсов с уроками для пользователя
+        """
+        for number in range(count):
+            course = Course.objects.create(name=f"Курс {number}", owner=self.user)
+            Lesson.objects.create(name=f"Урок {number}", course=course, owner=self.user)
+
+    def count_list_queries(self, page_size):
+        """
+        Подсчет количества запросов к БД при выводе страницы курсов
+        (после первого запроса, в котором определяются роли пользователя)
+        """
+        url = reverse("materials:courses-list")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"page_size": page_size})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_course_list(self):
+        """
+        Тест вывода списка объектов Course
+        """
+
+        url = reverse("materials:courses-list")
+        response = self.client.get(url)
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["results"][0]["lessons_count"], 1)
+        self.assertEqual(data["results"][0]["course_lessons"], [self.lesson.pk])
+        self.assertEqual(data["results"][0]["is_subscribed"], "Вы подписаны")
+
+    def test_course_list_ordering(self):
+        """
+        Тест однозначного порядка курсов с одинаковым значением поля сортировки
+        """
+
+        self.create_courses(3)
+        url = reverse("materials:courses-list")
+        ids = sorted(Course.objects.filter(lessons_count=1).values_list("id", flat=True))
+
+        for ordering, expected in (("lessons_count", ids), ("-lessons_count", ids[::-1])):
+            response = self.client.get(url, {"ordering": ordering, "page_size": 10})
+            self.assertEqual([course["id"] for course in response.json()["results"]], expected)
+
+    @override_settings(PAGINATION_COUNT_CACHE_TTL=60)
+    def test_course_list_cached_count(self):
+        """
+        Тест кэширования общего количества курсов и его сброса при создании курса
+        """
+
+        url = reverse("materials:courses-list")
+        with patch.object(CoursePaginator, "count_strategy", "cached"):
+            self.assertEqual(self.client.get(url).json()["count"], 1)
+
+            with CaptureQueriesContext(connection) as context:
+                data = self.client.get(url).json()
+            self.assertEqual(data["count"], 1)
+            self.assertTrue(data["count_is_exact"])
+            self.assertFalse(any("COUNT(*)" in query["sql"] for query in context.captured_queries))
+
+            self.create_courses(1)
+            self.assertEqual(self.client.get(url).json()["count"], 2)
+
+            # Без времени кэширования (кэш в памяти процесса) количество считается запросом
+            with override_settings(PAGINATION_COUNT_CACHE_TTL=0), CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.client.get(url).json()["count"], 2)
+            self.assertTrue(any("COUNT(*)" in query["sql"] for query in context.captured_queries))
+
+    def test_course_list_estimated_count(self):
+        """
+        Тест точного подсчета курсов, если оценка планировщика недоступна
+        """
+
+        url = reverse("materials:courses-list")
+        with patch.object(CoursePaginator, "count_strategy", "estimate"):
+            data = self.client.get(url).json()
+
+        self.assertEqual(data["count"], 1)
+        self.assertTrue(data["count_is_exact"])
+
+    def test_course_counters(self):
+        """
+        Тест обновления счетчиков курса при создании, переносе и удалении уроков, подписок и платежей
+        """
+
+        self.course.refresh_from_db()
+        self.assertEqual((self.course.lessons_count, self.course.subscriptions_count), (1, 1))
+
+        other_course = Course.objects.create(name="Тестовый курс 2", owner=self.user)
+        self.lesson.course = other_course
+        self.lesson.save()
+        payment = Payment.objects.create(amount=1000, payment_method="cash", course=self.course, owner=self.user)
+        payment.status = "paid"
+        payment.save()
+        Subscription.objects.filter(course=self.course).get().delete()
+
+        self.course.refresh_from_db()
+        other_course.refresh_from_db()
+        self.assertEqual((self.course.lessons_count, self.course.subscriptions_count,
+                          self.course.paid_payments_count), (0, 0, 1))
+        self.assertEqual(other_course.lessons_count, 1)
+
+        Course.objects.update(lessons_count=10)
+        call_command("rebuild_course_counters", stdout=StringIO())
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lessons_count, 0)
+
+    def test_popular_courses(self):
+        """
+        Тест вывода популярных курсов по количеству подписок
+        """
+
+        popular_course = Course.objects.create(name="Популярный курс", owner=self.user)
+        Subscription.objects.create(owner=self.user, course=popular_course)
+        Subscription.objects.create(owner=self.moderator, course=popular_course)
+
+        response = self.client.get(reverse("materials:courses-popular"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([course["id"] for course in response.json()["results"]], [popular_course.pk, self.course.pk])
+
+    def test_course_conditional_get(self):
+        """
+        Тест смены валидатора курса при изменении его урока и подписки пользователя
+        """
+
+        url = reverse("materials:courses-detail", args=[self.course.pk])
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.lesson.name = "Новое название"
+        self.lesson.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response["ETag"]
+        Subscription.objects.filter(course=self.course).delete()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    @override_settings(PAGINATION_COUNT_CACHE_TTL=60)
+    def test_course_list_conditional_get(self):
+        """
+        Тест валидатора страницы курсов без дополнительных запросов подсчета
+        """
+
+        url = reverse("materials:courses-list")
+        with patch.object(CoursePaginator, "count_strategy", "cached"):
+            etag = self.client.get(url)["ETag"]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertFalse(any("COUNT(" in query["sql"] or "MAX(" in query["sql"]
+                                 for query in context.captured_queries))
+
+            Subscription.objects.filter(course=self.course).delete()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        # Колонки ответа ограничены ?fields=, updated_at для валидатора загружается тем же запросом
+        self.create_courses(3)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, {"fields": "id,name"})
+        self.assertEqual(sum('FROM "materials_course"' in query["sql"] for query in context.captured_queries), 2)
+
+    def test_course_counters_validator(self):
+        """
+        Тест смены ETag курса при изменении счетчика без изменения updated_at курса
+        """
+
+        url = reverse("materials:courses-detail", args=[self.course.pk])
+        self.course.refresh_from_db()
+        response = self.client.get(url)
+        etag, updated_at = response["ETag"], self.course.updated_at
+
+        self.assertNotIn("Last-Modified", response)
+        self.assertFalse(any(post_init.has_listeners(model) for model in (Lesson, Subscription, Payment)))
+
+        Payment.objects.create(amount=1000, payment_method="cash", course=self.course, status="paid", owner=self.user)
+        self.course.refresh_from_db()
+
+        self.assertEqual((self.course.paid_payments_count, self.course.updated_at), (1, updated_at))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_course_sparse_fields(self):
+        """
+        Тест пропуска загрузки уроков и статуса подписки, если эти поля не запрошены
+        """
+
+        url = reverse("materials:courses-list")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"fields": "id,name,lessons_count"})
+
+        self.assertEqual(response.json()["results"], [{"id": self.course.pk, "name": self.course.name,
+                                                       "lessons_count": 1}])
+        self.assertFalse(any("materials_lesson" in query["sql"] or "materials_subscription" in query["sql"]
+                             for query in context.captured_queries))
+
+    def test_course_list_queries(self):
+        """
+        Тест постоянного количества запросов к БД независимо от размера страницы курсов
+        """
+
+        self.create_courses(2)
+        small_page_queries = self.count_list_queries(page_size=3)
+
+        self.create_courses(20)
+        large_page_queries = self.count_list_queries(page_size=23)
+
+        self.assertEqual(small_page_queries, large_page_queries)
+
+        # Модератор
+        self.client.force_authenticate(self.moderator)
+        self.assertEqual(self.count_list_queries(page_size=3), self.count_list_queries(page_size=23))
+
+    @override_settings(SERVER_TIMING_SLOW_QUERIES=1)
+    def test_course_list_server_timing(self):
+        """
+        Тест заголовка Server-Timing и записи в лог замеров запроса
+        """
+
+        url = reverse("materials:courses-list")
+        with CaptureQueriesContext(connection) as context, self.assertLogs("src.timing", "WARNING") as logs:
+            response = self.client.get(url)
+        timing = json.loads(logs.records[0].getMessage())
+
+        self.assertIn(f'desc="{len(context.captured_queries)} queries"', response["Server-Timing"])
+        self.assertIn("serializer;dur=", response["Server-Timing"])
+        self.assertEqual((timing["path"], timing["status"], timing["queries"]),
+                         (url, 200, len(context.captured_queries)))
+        self.assertGreater(timing["permissions_ms"], 0)
+
+        with override_settings(SERVER_TIMING_SAMPLE_RATE=0):
+            self.assertNotIn("Server-Timing", self.client.get(url))
+
+
+class EndpointBenchmarkTestCase(APITestCase):
+    """
+    Тестирование отсутствия N+1 запросов на эндпоинтах materials и users
+    """
+
+    def test_queries_do_not_grow_with_page_size(self):
+        """
+        Тест постоянного количества запросов к БД для всех ролей и размеров данных
+        """
+
+        results = run_benchmarks(sizes=(2, 10))
+
+        self.assertTrue(all(result["status"] == status.HTTP_200_OK for result in results))
+        self.assertEqual(find_regressions(results), [])
+
+
+class AsyncViewsTestCase(APITestCase):
+    """
+    Тестирование асинхронных представлений курсов, уроков и подписок
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        self.user = User.objects.create(email="test@email.com")
+        self.moderator = User.objects.create(email="moderator@email.com")
+        self.moderator.groups.add(Group.objects.create(name="Moderators"))
+        other = User.objects.create(email="other@email.com")
+
+        self.course = Course.objects.create(name="Тестовый курс 1", owner=self.user)
+        Course.objects.create(name="Тестовый курс 2", owner=other)
+        self.lesson = Lesson.objects.create(name="Тестовый урок 1", course=self.course, owner=self.user)
+        self.other_lesson = Lesson.objects.create(name="Тестовый урок 2", owner=other)
+        Subscription.objects.create(owner=self.user, course=self.course)
+
+    def get(self, user, url, async_url, params=None):
+        """
+        Ответы синхронного и асинхронного представлений на один и тот же запрос с JWT пользователя
+        """
+        headers = {"Authorization": f"Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}"}
+        self.client.credentials(HTTP_AUTHORIZATION=headers["Authorization"])
+        return self.client.get(url, params), async_to_sync(self.async_client.get)(async_url, params, headers=headers)
+
+    def test_async_views_match_sync(self):
+        """
+        Тест совпадения ответов асинхронных и синхронных представлений для пользователя и модератора
+        """
+
+        endpoints = [
+            (reverse("materials:courses-list"), reverse("materials:async-courses"), {"page_size": 1}),
+            (reverse("materials:courses-list"), reverse("materials:async-courses"), {"ordering": "-lessons_count"}),
+            (reverse("materials:courses-detail", args=[self.course.pk]),
+             reverse("materials:async-course", args=[self.course.pk]), {"omit": "description"}),
+            (reverse("materials:lessons"), reverse("materials:async-lessons"), {"fields": "id,name"}),
+            (reverse("materials:lesson", args=[self.lesson.pk]),
+             reverse("materials:async-lesson", args=[self.lesson.pk]), None),
+            (reverse("materials:subscriptions"), reverse("materials:async-subscriptions"), None),
+        ]
+        for user in (self.user, self.moderator):
+            for url, async_url, params in endpoints:
+                with self.subTest(user=user.email, url=async_url, params=params):
+                    response, async_response = self.get(user, url, async_url, params)
+                    data, async_data = response.json(), async_response.json()
+                    self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+                    if isinstance(data, dict) and "next" in data:
+                        # Ссылки на страницы ведут на асинхронное представление
+                        for link in ("next", "previous"):
+                            expected = data.pop(link)
+                            self.assertEqual(async_data.pop(link), expected and expected.replace(url, async_url))
+                    self.assertEqual(async_data, data)
+
+    @override_settings(AUTH_USER_CACHE_TTL=300)
+    def test_async_cached_user(self):
+        """
+        Тест асинхронной аутентификации через кэш пользователей без синхронных обращений к кэшу
+        """
+
+        cache.clear()
+        url = reverse("materials:async-lessons")
+        headers = {"Authorization": f"Bearer {RoleTokenObtainPairSerializer.get_token(self.user).access_token}"}
+        with patch("users.authentication.increment_counter", side_effect=AssertionError):
+            for _ in range(2):
+                response = async_to_sync(self.async_client.get)(url, headers=headers)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_user_cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_async_views_errors(self):
+        """
+        Тест ответов асинхронных представлений без токена, без прав на объект и для несуществующего объекта
+        """
+
+        response = async_to_sync(self.async_client.get)(reverse("materials:async-lessons"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        url = reverse("materials:lesson", args=[self.other_lesson.pk])
+        response, async_response = self.get(self.user, url,
+                                            reverse("materials:async-lesson", args=[self.other_lesson.pk]))
+        self.assertEqual(async_response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(async_response.json(), response.json())
+
+        response, async_response = self.get(self.user, reverse("materials:lesson", args=[0]),
+                                            reverse("materials:async-lesson", args=[0]))
+        self.assertEqual(async_response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(async_response.json(), response.json())
+
+
+class SyntheticDatasetTestCase(APITestCase):
+    """
+    Тестирование генерации синтетических данных командой generate_dataset
+    """
+
+    def generate(self, prefix):
+        """
+        Генерация небольшого набора данных и его структура (количество уроков по курсам, подписок и платежей)
+        """
+        call_command("generate_dataset", "--users", "20", "--moderators", "2", "--courses", "10",
+                     "--lessons-per-course", "4", "--seed", "7", "--batch-size", "7", "--prefix", prefix,
+                     stdout=StringIO())
+        courses = Course.objects.filter(owner__email__startswith=f"{prefix}-").order_by("id")
+        return {
+            "lessons": [course.lessons.count() for course in courses],
+            "lessons_count": list(courses.values_list("lessons_count", flat=True)),
+            "subscriptions": Subscription.objects.filter(owner__email__startswith=f"{prefix}-").count(),
+            "payments": Payment.objects.filter(owner__email__startswith=f"{prefix}-").count(),
+        }
+
+    def test_generate_dataset(self):
+        """
+        Тест одинаковых данных при одинаковом seed, пересчета счетчиков и создания модераторов
+        """
+
+        first = self.generate("first")
+        second = self.generate("second")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["lessons"], first["lessons_count"])
+        self.assertEqual(User.objects.filter(email__startswith="first-", groups__name="Moderators").count(), 2)
+        self.assertTrue(User.objects.get(email="first-user-0@example.com").check_password("password"))
+
+        with self.assertRaises(CommandError):
+            self.generate("first")
+
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, Lesson, Payment
+from .models import Course, Lesson, Payment, StripePrice
 
 
 @admin.register(Course)
@@ -14,4 +14,9 @@ class LessonAdmin(admin.ModelAdmin):
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
-    list_display = ("id", "payment_date")
\ No newline at end of file
+    list_display = ("id", "payment_date")
+
+
+@admin.register(StripePrice)
+class StripePriceAdmin(admin.ModelAdmin):
+    list_display = ("id", "course", "lesson", "amount", "currency", "price_id")
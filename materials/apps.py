@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class MaterialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'materials'
\ No newline at end of file
+    name = 'materials'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Course, Lesson, Payment, Subscription
+
+# Модель -> (поле счетчика в Course, условие учета объекта в счетчике)
+COURSE_COUNTERS = {
+    Lesson: ("lessons_count", lambda instance: True),
+    Subscription: ("subscriptions_count", lambda instance: instance.is_active),
+    Payment: ("paid_payments_count", lambda instance: instance.status == "paid"),
+}
+
+# Поля счетчиков курса
+COUNTER_FIELDS = tuple(field for field, _ in COURSE_COUNTERS.values())
+
+# Поля объекта, от которых зависит его учет в счетчиках
+TRACKED_FIELDS = {
+    Lesson: ("course",),
+    Subscription: ("course", "is_active"),
+    Payment: ("course", "status"),
+}
+
+bulk_changes_active = ContextVar("bulk_changes_active", default=False)
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Массовое изменение объектов: сигналы не обновляют счетчики курсов и кэш количества объектов построчно,
+    вызывающий код пересчитывает их один раз после операции
+    """
+    token = bulk_changes_active.set(True)
+    try:
+        yield
+    finally:
+        bulk_changes_active.reset(token)
+
+
+def get_counted_course_id(instance):
+    """
+    Курс, в счетчике которого учитывается объект, или None
+    """
+    _, is_counted = COURSE_COUNTERS[type(instance)]
+    return instance.course_id if instance.course_id and is_counted(instance) else None
+
+
+def change_course_counter(model, course_id, delta):
+    """
+    Изменение счетчика курса на месте, без чтения объекта курса.
+    Меняется только колонка счетчика: updated_at курса отражает изменение самого курса, а не каждого платежа
+    """
+    if course_id is None or delta == 0 or bulk_changes_active.get():
+        return
+    field, _ = COURSE_COUNTERS[model]
+    Course.objects.filter(pk=course_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_for_course(queryset):
+    """
+    Подзапрос количества объектов, относящихся к курсу
+    """
+    return Coalesce(Subquery(queryset.filter(course=OuterRef("pk")).order_by().values("course")
+                             .annotate(total=Count("id")).values("total")), 0)
+
+
+def rebuild_course_counters(queryset=None):
+    """
+    Пересчет счетчиков курсов одним UPDATE (исправление расхождений, массовые операции без сигналов)
+    """
+    queryset = Course.objects.all() if queryset is None else queryset
+    return queryset.update(
+        lessons_count=count_for_course(Lesson.objects.all()),
+        subscriptions_count=count_for_course(Subscription.objects.filter(is_active=True)),
+        paid_payments_count=count_for_course(Payment.objects.filter(status="paid")),
+    )
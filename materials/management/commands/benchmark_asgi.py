@@ -0,0 +1,91 @@
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.benchmarks import delete_dataset, get_asgi_endpoints, run_asgi_benchmark, seed_dataset
+from users.serializers import RoleTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    """
+    Сравнение синхронных (DRF) и асинхронных представлений курсов, уроков и подписок под uvicorn:
+    запросы в секунду, перцентили времени ответа и память процесса сервера.
+    Каждый вариант измеряется в отдельно запущенном сервере
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=20, help="Количество курсов, уроков и подписок пользователя")
+        parser.add_argument("--requests", type=int, default=500, help="Количество запросов к каждому эндпоинту")
+        parser.add_argument("--concurrency", type=int, default=50, help="Количество параллельных соединений")
+        parser.add_argument("--workers", type=int, default=1, help="Количество воркеров uvicorn")
+        parser.add_argument("--port", type=int, default=8765, help="Порт uvicorn")
+        parser.add_argument("--output", default="", help="Путь к JSON-отчету")
+
+    def start_server(self, port, workers):
+        """
+        Запуск uvicorn с приложением conf.asgi и ожидание готовности
+        """
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "conf.asgi:application", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=settings.BASE_DIR,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"uvicorn завершился с кодом {process.returncode}")
+            try:
+                requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+                return process
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError("uvicorn не запустился за 30 секунд")
+
+    def handle(self, *args, **options):
+
+        if importlib.util.find_spec("uvicorn") is None:
+            raise CommandError("Для замера требуется uvicorn (зависимость для разработки): "
+                               "poetry install или pip install uvicorn")
+
+        prefix = f"asgi-{uuid.uuid4().hex[:8]}"
+        dataset = seed_dataset(options["size"], prefix=prefix)
+        try:
+            token = str(RoleTokenObtainPairSerializer.get_token(dataset["user"]).access_token)
+            endpoints = get_asgi_endpoints(dataset, options["size"])
+            report = {"size": options["size"], "workers": options["workers"]}
+            for mode, index in (("sync", 1), ("async", 2)):
+                process = self.start_server(options["port"], options["workers"])
+                try:
+                    report[mode] = run_asgi_benchmark(
+                        f"http://127.0.0.1:{options['port']}", token,
+                        [(endpoint[0], endpoint[index]) for endpoint in endpoints],
+                        requests_count=options["requests"], concurrency=options["concurrency"], pid=process.pid)
+                finally:
+                    process.terminate()
+                    process.wait()
+        finally:
+            delete_dataset(prefix)
+
+        for sync_phase, async_phase in zip(report["sync"]["phases"], report["async"]["phases"]):
+            self.stdout.write(f"{sync_phase['phase']:<19} "
+                              f"sync: rps={sync_phase['throughput_rps']} p95={sync_phase['p95_ms']}ms "
+                              f"errors={sync_phase['errors']} | "
+                              f"async: rps={async_phase['throughput_rps']} p95={async_phase['p95_ms']}ms "
+                              f"errors={async_phase['errors']}")
+        for mode in ("sync", "async"):
+            memory = report[mode]["memory"]
+            if memory:
+                self.stdout.write(f"Память ({mode}): {memory['rss_mb']} МБ, пик {memory['peak_rss_mb']} МБ")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчет сохранен в {options['output']}"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from src.benchmarks import run_serialization_benchmarks
+
+
+class Command(BaseCommand):
+    """
+    Сравнение стоимости вывода строки списка: ModelSerializer и быстрый вывод через values().
+    Тестовые данные создаются внутри транзакции и откатываются после замеров
+    """
+
+    def handle(self, *args, **options):
+
+        with transaction.atomic():
+            results = run_serialization_benchmarks(options["size"])
+            transaction.set_rollback(True)
+
+        for result in results:
+            self.stdout.write(f"{result['serializer']:<24} rows={result['rows']:<7} "
+                              f"serializer={result['serializer_us_per_row']}us/row "
+                              f"fast={result['fast_us_per_row']}us/row x{result['speedup']}")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1000, help="Количество строк в списке")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from src.synthetic_data import DEFAULT_PASSWORD, DatasetGenerator
+
+
+class Command(BaseCommand):
+    """
+    Генерация синтетических данных для нагрузочных тестов: пользователи, модераторы, курсы, уроки, подписки и платежи.
+    При одинаковых параметрах и --seed данные совпадают, что позволяет сравнивать замеры между запусками
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Количество пользователей")
+        parser.add_argument("--moderators", type=int, default=10, help="Количество модераторов")
+        parser.add_argument("--courses", type=int, default=100, help="Количество курсов")
+        parser.add_argument("--lessons-per-course", type=float, default=10, help="Среднее количество уроков в курсе")
+        parser.add_argument("--max-lessons", type=int, default=1000, help="Максимальное количество уроков в курсе")
+        parser.add_argument("--lessons-skew", type=float, default=1.5,
+                            help="Параметр распределения Парето для количества уроков (> 1, меньше - сильнее перекос)")
+        parser.add_argument("--popularity-skew", type=float, default=1.1,
+                            help="Показатель закона Ципфа для популярности курсов в подписках и платежах")
+        parser.add_argument("--subscriptions-per-user", type=int, default=3,
+                            help="Среднее количество подписок пользователя")
+        parser.add_argument("--payments-per-user", type=int, default=2, help="Среднее количество платежей пользователя")
+        parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора случайных чисел")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Количество строк в одной вставке")
+        parser.add_argument("--prefix", default="synthetic", help="Префикс email созданных пользователей")
+
+    def report_progress(self, table, stats):
+        self.stdout.write(f"{table:<13} строк: {stats['rows']}, {stats['time_s']} с, {stats['rows_per_s']} строк/с")
+
+    def handle(self, *args, **options):
+
+        if options["lessons_skew"] <= 1:
+            raise CommandError("--lessons-skew должен быть больше 1")
+        generator = DatasetGenerator(
+            users=options["users"], moderators=options["moderators"], courses=options["courses"],
+            lessons_per_course=options["lessons_per_course"], max_lessons=options["max_lessons"],
+            lessons_skew=options["lessons_skew"], popularity_skew=options["popularity_skew"],
+            subscriptions_per_user=options["subscriptions_per_user"],
+            payments_per_user=options["payments_per_user"], seed=options["seed"],
+            batch_size=options["batch_size"], prefix=options["prefix"], progress=self.report_progress,
+        )
+        if generator.exists():
+            raise CommandError(f"Данные с префиксом {options['prefix']} уже созданы, укажите другой --prefix")
+
+        stats = generator.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано строк: {sum(table['rows'] for table in stats.values())}. "
+            f"Пароль пользователей: {DEFAULT_PASSWORD}"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from materials.counters import rebuild_course_counters
+
+
+class Command(BaseCommand):
+    """
+    Пересчет счетчиков уроков, активных подписок и оплат у курсов
+    """
+
+    def handle(self, *args, **options):
+
+        updated = rebuild_course_counters()
+
+        self.stdout.write(self.style.SUCCESS(f"Счетчики пересчитаны для {updated} курсов"))
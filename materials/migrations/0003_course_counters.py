@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_course_counters(apps, schema_editor):
+    Course = apps.get_model("materials", "Course")
+    Lesson = apps.get_model("materials", "Lesson")
+    Subscription = apps.get_model("materials", "Subscription")
+    Payment = apps.get_model("materials", "Payment")
+
+    def count_for_course(queryset):
+        return Coalesce(Subquery(queryset.filter(course=OuterRef("pk")).order_by().values("course")
+                                 .annotate(total=Count("id")).values("total")), 0)
+
+    Course.objects.update(
+        lessons_count=count_for_course(Lesson.objects.all()),
+        subscriptions_count=count_for_course(Subscription.objects.filter(is_active=True)),
+        paid_payments_count=count_for_course(Payment.objects.filter(status="paid")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество уроков'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='paid_payments_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество оплат'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='subscriptions_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество активных подписок'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-lessons_count', 'id'], name='course_lessons_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-subscriptions_count', 'id'], name='course_subscriptions_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-paid_payments_count', 'id'], name='course_paid_payments_count_idx'),
+        ),
+        migrations.RunPython(fill_course_counters, migrations.RunPython.noop),
+    ]
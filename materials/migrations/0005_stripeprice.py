@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripePrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Сумма')),
+                ('currency', models.CharField(max_length=3, verbose_name='Валюта')),
+                ('product_id', models.CharField(max_length=255, verbose_name='ID продукта в stripe')),
+                ('price_id', models.CharField(max_length=255, verbose_name='ID цены в stripe')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stripe_prices', to='materials.course', verbose_name='Курс')),
+                ('lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stripe_prices', to='materials.lesson', verbose_name='Урок')),
+            ],
+            options={
+                'verbose_name': 'Цена в stripe',
+                'verbose_name_plural': 'Цены в stripe',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('course__isnull', False)), fields=('course', 'amount', 'currency'), name='stripe_price_course_unique'), models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('lesson', 'amount', 'currency'), name='stripe_price_lesson_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('materials', '0005_stripeprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True, verbose_name='ID события в stripe')),
+                ('type', models.CharField(max_length=100, verbose_name='Тип события')),
+                ('session_id', models.CharField(max_length=255, verbose_name='ID сессии')),
+                ('status', models.CharField(max_length=50, verbose_name='Статус платежа')),
+                ('created', models.DateTimeField(verbose_name='Дата события')),
+                ('processed', models.BooleanField(db_index=True, default=False, verbose_name='Обработано')),
+            ],
+            options={
+                'verbose_name': 'Событие stripe',
+                'verbose_name_plural': 'События stripe',
+            },
+        ),
+    ]
@@ -14,9 +14,19 @@ class Course(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, verbose_name="Владелец", null=True,
                               blank=True, related_name="courses")
 
+    lessons_count = models.PositiveIntegerField(verbose_name="Количество уроков", default=0)
+    subscriptions_count = models.PositiveIntegerField(verbose_name="Количество активных подписок", default=0)
+    paid_payments_count = models.PositiveIntegerField(verbose_name="Количество оплат", default=0)
+    updated_at = models.DateTimeField(verbose_name="Дата изменения", auto_now=True)
+
     class Meta:
         verbose_name = "Курс"
         verbose_name_plural = "Курсы"
+        indexes = [
+            models.Index(fields=["-lessons_count", "id"], name="course_lessons_count_idx"),
+            models.Index(fields=["-subscriptions_count", "id"], name="course_subscriptions_count_idx"),
+            models.Index(fields=["-paid_payments_count", "id"], name="course_paid_payments_count_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -31,6 +41,7 @@ class Lesson(models.Model):
                                related_name="lessons")
     owner = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, verbose_name="Владелец", null=True,
                               blank=True, related_name="lessons")
+    updated_at = models.DateTimeField(verbose_name="Дата изменения", auto_now=True)
 
     class Meta:
         verbose_name = "Урок"
@@ -56,6 +67,7 @@ class Payment(models.Model):
 
     session_id = models.CharField(max_length=255, blank=True, null=True, verbose_name="ID сессии")
     status = models.CharField(max_length=50, verbose_name="Статус", default="unpaid")
+    updated_at = models.DateTimeField(verbose_name="Дата изменения", auto_now=True)
 
     class Meta:
         verbose_name = "Платеж"
@@ -71,10 +83,52 @@ class Subscription(models.Model):
                               related_name="subscriptions")
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="Курс", related_name="subscriptions")
     created_at = models.DateField(verbose_name="Дата активации", auto_now_add=True)
+    updated_at = models.DateTimeField(verbose_name="Дата изменения", auto_now=True)
 
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
 
     def __str__(self):
-        return f"Подписка пользователя {self.owner.name} на курс {self.course.name} от {self.created_at}"
\ No newline at end of file
+        return f"Подписка пользователя {self.owner.name} на курс {self.course.name} от {self.created_at}"
+
+
+class StripePrice(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name="Курс", null=True, blank=True,
+                               related_name="stripe_prices")
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, verbose_name="Урок", null=True, blank=True,
+                               related_name="stripe_prices")
+    amount = models.PositiveIntegerField(verbose_name="Сумма")
+    currency = models.CharField(max_length=3, verbose_name="Валюта")
+    product_id = models.CharField(max_length=255, verbose_name="ID продукта в stripe")
+    price_id = models.CharField(max_length=255, verbose_name="ID цены в stripe")
+    created_at = models.DateTimeField(verbose_name="Дата создания", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Цена в stripe"
+        verbose_name_plural = "Цены в stripe"
+        constraints = [
+            models.UniqueConstraint(fields=["course", "amount", "currency"], condition=models.Q(course__isnull=False),
+                                    name="stripe_price_course_unique"),
+            models.UniqueConstraint(fields=["lesson", "amount", "currency"], condition=models.Q(course__isnull=True),
+                                    name="stripe_price_lesson_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.price_id} - {self.amount} {self.currency}"
+
+
+class StripeEvent(models.Model):
+    event_id = models.CharField(max_length=255, unique=True, verbose_name="ID события в stripe")
+    type = models.CharField(max_length=100, verbose_name="Тип события")
+    session_id = models.CharField(max_length=255, verbose_name="ID сессии")
+    status = models.CharField(max_length=50, verbose_name="Статус платежа")
+    created = models.DateTimeField(verbose_name="Дата события")
+    processed = models.BooleanField(verbose_name="Обработано", default=False, db_index=True)
+
+    class Meta:
+        verbose_name = "Событие stripe"
+        verbose_name_plural = "События stripe"
+
+    def __str__(self):
+        return f"{self.type} {self.event_id}"
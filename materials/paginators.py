@@ -1,7 +1,176 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from functools import partial
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination, Cursor, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
-class CoursePaginator(PageNumberPagination):
+COUNT_STRATEGIES = ("exact", "cached", "estimate")
+
+
+def get_count_cache_version(model):
+    """
+    Версия кэша количества объектов модели; меняется при создании и удалении объектов
+    """
+    return cache.get_or_set(f"pagination_count_version:{model._meta.label_lower}", 1, timeout=None)
+
+
+def invalidate_count_cache(model):
+    """
+    Сброс кэшированных количеств объектов модели
+    """
+    key = f"pagination_count_version:{model._meta.label_lower}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк планировщиком Postgres: reltuples для всей таблицы, EXPLAIN для выборки с фильтром.
+    Для других СУБД возвращает None
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # reltuples = -1, если таблица еще ни разу не анализировалась
+            if row and row[0] >= 0:
+                return row[0]
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return int(cursor.fetchone()[0][0]["Plan"]["Plan Rows"])
+
+
+class CountingPaginator(DjangoPaginator):
+    """
+    Пагинатор Django с выбором способа подсчета общего количества объектов:
+    exact - COUNT(*), cached - COUNT(*) с кэшированием на cache_ttl секунд (при 0 - без кэша),
+    estimate - оценка планировщика выше порога
+    """
+
+    def __init__(self, object_list, per_page, count_strategy="exact", cache_ttl=60, estimate_threshold=100000,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy
+        self.cache_ttl = cache_ttl
+        self.estimate_threshold = estimate_threshold
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        if self.count_strategy == "estimate":
+            estimated = estimate_count(self.object_list)
+            if estimated is not None and estimated >= self.estimate_threshold:
+                self.count_is_exact = False
+                return estimated
+        elif self.count_strategy == "cached" and self.cache_ttl:
+            return self.get_cached_count()
+        return super().count
+
+    def get_cached_count(self):
+        queryset = self.object_list.order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+        version = get_count_cache_version(queryset.model)
+        key = f"pagination_count:{queryset.model._meta.label_lower}:{version}:{digest}"
+        return cache.get_or_set(key, queryset.count, timeout=self.cache_ttl)
+
+
+class CountStrategyMixin:
+    """
+    Подсчет общего количества объектов выбранным способом и признак count_is_exact в ответе.
+    Способ по умолчанию задается настройкой PAGINATION_COUNT_STRATEGY
+    """
+    count_strategy = None
+
+    def get_count_strategy(self):
+        count_strategy = self.count_strategy or settings.PAGINATION_COUNT_STRATEGY
+        if count_strategy not in COUNT_STRATEGIES:
+            raise ImproperlyConfigured(f"Неизвестный способ подсчета количества объектов: {count_strategy}")
+        return count_strategy
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CountingPaginator,
+            count_strategy=self.get_count_strategy(),
+            cache_ttl=settings.PAGINATION_COUNT_CACHE_TTL,
+            estimate_threshold=settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD,
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_is_exact": self.page.paginator.count_is_exact,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_exact"] = {"type": "boolean", "example": True}
+        return response_schema
+
+
+def get_cursor_link(paginator_class, url, position):
+    """
+    Ссылка на страницу курсорной пагинации, начинающуюся после объекта с ключом сортировки position
+    """
+    paginator = paginator_class()
+    paginator.base_url = url
+    return paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(position)))
+
+
+class CursorSwitchMixin:
+    """
+    Переключение пагинатора на курсорную пагинацию по параметру запроса
+    (?pagination=cursor или наличие параметра cursor)
+    """
+    cursor_paginator_class = None
+    pagination_query_param = "pagination"
+
+    def is_cursor_requested(self, request):
+        return (request.query_params.get(self.pagination_query_param) == "cursor"
+                or self.cursor_paginator_class.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.is_cursor_requested(request):
+            self.cursor_paginator = self.cursor_paginator_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class WithoutPagination(BasePagination):
+    """
+    Вывод списка целиком, без разбиения на страницы
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return None
+
+
+class CoursePaginator(CountStrategyMixin, PageNumberPagination):
     """
     Пагинатор для списка объектов Course
     """
@@ -10,10 +179,56 @@ class CoursePaginator(PageNumberPagination):
     max_page_size = 100
 
 
-class LessonPaginator(PageNumberPagination):
+class LessonCursorPaginator(CursorPagination):
+    """
+    Курсорный пагинатор для списка объектов Lesson: стоимость страницы не зависит от ее номера
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "id"
+
+
+class LessonPaginator(CursorSwitchMixin, CountStrategyMixin, PageNumberPagination):
     """
     Пагинатор для списка объектов Lesson
     """
     page_size = 20
     page_size_query_param = "page_size"
-    max_page_size = 1000
\ No newline at end of file
+    max_page_size = 1000
+    cursor_paginator_class = LessonCursorPaginator
+
+
+class SubscriptionCursorPaginator(CursorPagination):
+    """
+    Курсорный пагинатор для списка объектов Subscription
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "id"
+
+
+class SubscriptionPaginator(CursorSwitchMixin, WithoutPagination):
+    """
+    Пагинатор для списка объектов Subscription: без параметров список выводится целиком
+    """
+    cursor_paginator_class = SubscriptionCursorPaginator
+
+
+class PaymentCursorPaginator(CursorPagination):
+    """
+    Курсорный пагинатор для списка объектов Payment.
+    Ключ по умолчанию - id, с параметром ?ordering=payment_date - дата платежа
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "id"
+
+
+class PaymentPaginator(CursorSwitchMixin, WithoutPagination):
+    """
+    Пагинатор для списка объектов Payment: без параметров список выводится целиком
+    """
+    cursor_paginator_class = PaymentCursorPaginator
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from src.utils import invalidate_stripe_prices
+from .counters import TRACKED_FIELDS, bulk_changes_active, change_course_counter, get_counted_course_id
+from .models import Course, Lesson, Payment, Subscription
+from .paginators import invalidate_count_cache
+
+# Модель -> пары (поле, атрибут объекта с исходным значением), загружаемые перед сохранением
+PREVIOUS_STATE_FIELDS = {
+    Course: [("name", "_loaded_name")],
+    Lesson: [("course", "_counted_course_id"), ("name", "_loaded_name")],
+    Subscription: [(field, "_counted_course_id") for field in TRACKED_FIELDS[Subscription]],
+    Payment: [(field, "_counted_course_id") for field in TRACKED_FIELDS[Payment]],
+}
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def invalidate_count_on_create(sender, instance, created, **kwargs):
+    """
+    Сброс кэшированного количества объектов при создании объекта
+    """
+    if created:
+        invalidate_count_cache(sender)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Lesson)
+def invalidate_count_on_delete(sender, instance, **kwargs):
+    """
+    Сброс кэшированного количества объектов при удалении объекта (при массовом удалении - один раз после него)
+    """
+    if not bulk_changes_active.get():
+        invalidate_count_cache(sender)
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=Subscription)
+@receiver(pre_save, sender=Payment)
+def load_previous_state(sender, instance, **kwargs):
+    """
+    Загрузка исходного состояния изменяемого объекта одним запросом: курс, в счетчике которого он учтен,
+    и название (для сброса цен stripe). Состояние загружается только при сохранении, а не при каждом чтении объекта;
+    после сохранения оно запоминается на объекте, поэтому повторное сохранение не требует запроса
+    """
+    if instance._state.adding:
+        return
+    fields = [field for field, attribute in PREVIOUS_STATE_FIELDS[sender] if not hasattr(instance, attribute)]
+    if not fields:
+        return
+    previous = sender.objects.only(*fields).filter(pk=instance.pk).first()
+    if "name" in fields:
+        instance._loaded_name = previous.name if previous else None
+    if sender in TRACKED_FIELDS and not hasattr(instance, "_counted_course_id"):
+        instance._counted_course_id = get_counted_course_id(previous) if previous else None
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Payment)
+def update_course_counter_on_save(sender, instance, created, **kwargs):
+    """
+    Обновление счетчиков курса при создании объекта, смене курса или статуса
+    """
+    previous_course_id = None if created else getattr(instance, "_counted_course_id", None)
+    course_id = get_counted_course_id(instance)
+    if previous_course_id != course_id:
+        change_course_counter(sender, previous_course_id, -1)
+        change_course_counter(sender, course_id, 1)
+    instance._counted_course_id = course_id
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Payment)
+def update_course_counter_on_delete(sender, instance, **kwargs):
+    """
+    Уменьшение счетчика курса при удалении объекта
+    """
+    change_course_counter(sender, getattr(instance, "_counted_course_id", get_counted_course_id(instance)), -1)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def invalidate_stripe_prices_on_rename(sender, instance, created, **kwargs):
+    """
+    Сброс сохраненных цен stripe при переименовании курса или урока: новый продукт получит новое название
+    """
+    if not created and getattr(instance, "_loaded_name", instance.name) != instance.name:
+        invalidate_stripe_prices(**{sender._meta.model_name: instance})
+    instance._loaded_name = instance.name
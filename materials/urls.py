@@ -11,7 +11,13 @@ router.register("courses", views.CourseViewSet, basename="courses")
 
 urlpatterns = [
     path("lessons/", views.LessonListCreateAPIView.as_view(), name="lessons"),
+    path("lessons/bulk/", views.LessonBulkAPIView.as_view(), name="lessons-bulk"),
     path("lessons/<int:pk>/", views.LessonRetrieveUpdateDestroyAPIView.as_view(), name="lesson"),
     path("subscriptions/", views.SubscriptionListCreateAPIView.as_view(), name="subscriptions"),
     path("subscriptions/<int:pk>/", views.SubscriptionRetrieveUpdateDestroyAPIView.as_view(), name="subscription"),
+    path("async/courses/", views.AsyncCourseListView.as_view(), name="async-courses"),
+    path("async/courses/<int:pk>/", views.AsyncCourseRetrieveView.as_view(), name="async-course"),
+    path("async/lessons/", views.AsyncLessonListView.as_view(), name="async-lessons"),
+    path("async/lessons/<int:pk>/", views.AsyncLessonRetrieveView.as_view(), name="async-lesson"),
+    path("async/subscriptions/", views.AsyncSubscriptionListView.as_view(), name="async-subscriptions"),
 ] + router.urls
\ No newline at end of file
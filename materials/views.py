@@ -1,20 +1,61 @@
-from django.contrib.auth.models import Group
-from rest_framework import generics, viewsets
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Prefetch, Subquery
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
+from src.async_views import AsyncListView, AsyncRetrieveView
+from src.conditional import ConditionalGetMixin
+from src.fastpath import FastListMixin
+from src.filters import StableOrderingFilter
+from src.fieldsets import SparseQuerysetMixin
+from src.permissions import QuerysetPermissionMixin
+from src.timing import TimedPermissionsMixin
 from src.utils import get_queryset_for_owner
 from users.permissions import IsModerator, IsOwner
+from users.roles import get_user_roles
 
-from .models import Course, Lesson, Subscription
-from .paginators import CoursePaginator, LessonPaginator
+from .counters import COUNTER_FIELDS, bulk_changes, rebuild_course_counters
+from .models import Course, Lesson, Payment, Subscription
+from .paginators import CoursePaginator, LessonPaginator, SubscriptionPaginator, invalidate_count_cache
 from .serializers import CourseSerializer, LessonSerializer, StaffCourseSerializer, SubscriptionSerializer
 
 
-
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseQuerysetMixin:
+    """
+    Выборка курсов и сериализатор по роли пользователя, общие для синхронных и асинхронных представлений
+    """
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    filter_backends = [StableOrderingFilter]
+    ordering_fields = ["lessons_count", "subscriptions_count", "paid_payments_count"]
+
+    def get_queryset(self):
+        """
+        Список уроков и статус подписки загружаются вместе со страницей курсов,
+        чтобы число запросов не зависело от размера страницы. Поля, не запрошенные в ?fields=, не загружаются
+        """
+        queryset = self.queryset
+        if self.is_field_requested("is_subscribed"):
+            queryset = queryset.annotate(
+                is_subscribed=Exists(Subscription.objects.filter(owner=self.request.user.pk, course=OuterRef("pk"))),
+            )
+        if self.is_field_requested("course_lessons"):
+            queryset = queryset.prefetch_related(Prefetch("lessons", queryset=Lesson.objects.order_by("id")))
+        return get_queryset_for_owner(self.request.user, queryset)
+
+    def get_serializer_class(self):
+        if get_user_roles(self.request.user).has_full_access:
+            return StaffCourseSerializer
+        return CourseSerializer
+
+
+class CourseViewSet(CourseQuerysetMixin, ConditionalGetMixin, SparseQuerysetMixin, TimedPermissionsMixin,
+                    viewsets.ModelViewSet):
     pagination_class = CoursePaginator
+    # Счетчики курса меняются без updated_at, поэтому валидатор курса - только ETag
+    use_last_modified = False
 
     def get_permissions(self):
         if self.action == "create":
@@ -25,23 +66,46 @@ class CourseViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsOwner | IsAdminUser]
         return super().get_permissions()
 
-    def get_queryset(self):
-        return get_queryset_for_owner(self.request.user, self.queryset)
+    def get_object_validator(self):
+        """
+        Валидатор курса меняется также при изменении его счетчиков, уроков и подписки пользователя на курс
+        """
+        subscription = Subscription.objects.filter(course=OuterRef("pk"), owner=self.request.user.pk)
+        return self.get_validator_queryset().filter(pk=self.kwargs["pk"]).annotate(
+            lessons_updated_at=Max("lessons__updated_at"),
+            subscription_updated_at=Subquery(subscription.values("updated_at")[:1]),
+        ).values("updated_at", *COUNTER_FIELDS, "lessons_updated_at", "subscription_updated_at").first()
+
+    def get_row_validator(self, course):
+        """
+        Валидатор курса на странице списка меняется также при изменении его счетчиков, уроков и подписки пользователя
+        """
+        parts = super().get_row_validator(course) + tuple(
+            getattr(course, field) for field in COUNTER_FIELDS if self.is_field_requested(field))
+        if self.is_field_requested("course_lessons"):
+            parts += tuple((lesson.pk, lesson.updated_at) for lesson in course.lessons.all())
+        if self.is_field_requested("is_subscribed"):
+            parts += (course.is_subscribed,)
+        return parts
 
     def perform_create(self, serializer):
         course = serializer.save()
         course.owner = self.request.user
         course.save()
 
-    def get_serializer_class(self):
-        try:
-            if self.request.user.is_superuser or self.request.user.groups.get(name="Moderators"):
-                return StaffCourseSerializer
-        except Group.DoesNotExist:
-            return CourseSerializer
+    @action(detail=False)
+    def popular(self, request):
+        """
+        Список популярных курсов по количеству активных подписок (сортировка по индексу)
+        """
+        queryset = self.get_queryset().order_by("-subscriptions_count", "id")
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class LessonListCreateAPIView(generics.ListCreateAPIView):
+class LessonListCreateAPIView(ConditionalGetMixin, SparseQuerysetMixin, FastListMixin, TimedPermissionsMixin,
+                              generics.ListCreateAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     pagination_class = LessonPaginator
@@ -55,12 +119,85 @@ class LessonListCreateAPIView(generics.ListCreateAPIView):
         return get_queryset_for_owner(self.request.user, self.queryset)
 
     def perform_create(self, serializer):
-        lesson = serializer.save()
-        lesson.owner = self.request.user
-        lesson.save()
+        serializer.save(owner=self.request.user)
+
+
+class LessonBulkAPIView(QuerysetPermissionMixin, TimedPermissionsMixin, generics.GenericAPIView):
+    """
+    Массовое создание (POST), обновление (PATCH) и удаление (DELETE) объектов Lesson одной транзакцией.
+    Права на изменение и удаление те же, что и для одного урока, и проверяются условием выборки
+    """
+    queryset = Lesson.objects.all()
+    serializer_class = LessonSerializer
+    max_batch_size = 1000
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            self.permission_classes = [~IsModerator]
+        elif self.request.method == "PATCH":
+            self.permission_classes = [IsOwner | IsModerator | IsAdminUser]
+        elif self.request.method == "DELETE":
+            self.permission_classes = [IsOwner | IsAdminUser]
+        return super().get_permissions()
+
+    @staticmethod
+    def get_ids(items):
+        """
+        Список корректных id из элементов запроса
+        """
+        ids = []
+        for item in items if isinstance(items, list) else []:
+            try:
+                ids.append(int(item["id"] if isinstance(item, dict) else item))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return ids
+
+    def post(self, request, *args, **kwargs):
+        """
+        Создание уроков: при ошибке в любом элементе ничего не сохраняется, ошибки возвращаются по позициям
+        """
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.max_batch_size)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save(owner=request.user)
+        invalidate_count_cache(Lesson)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def patch(self, request, *args, **kwargs):
+        """
+        Частичное обновление уроков, доступных пользователю (владелец, модератор, администратор)
+        """
+        lessons = self.filter_permitted(self.queryset).in_bulk(self.get_ids(request.data))
+        serializer = self.get_serializer(lessons, data=request.data, many=True, partial=True,
+                                         max_length=self.max_batch_size)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
 
-class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+    def delete(self, request, *args, **kwargs):
+        """
+        Удаление уроков по списку {"ids": [...]}, доступных пользователю (владелец, администратор)
+        """
+        ids = self.get_ids(request.data.get("ids") if isinstance(request.data, dict) else request.data)
+        queryset = self.filter_permitted(self.queryset)
+        with transaction.atomic(), bulk_changes():
+            lessons = dict(queryset.filter(id__in=ids).values_list("id", "course_id"))
+            # Счетчики курсов уроков и каскадно удаляемых платежей пересчитываются один раз после удаления
+            course_ids = set(lessons.values()) | set(
+                Payment.objects.filter(lesson__in=lessons).values_list("course_id", flat=True))
+            queryset.filter(id__in=lessons).delete()
+            rebuild_course_counters(Course.objects.filter(pk__in=course_ids - {None}))
+        deleted = set(lessons)
+        if deleted:
+            invalidate_count_cache(Lesson)
+        return Response({"results": [{"id": lesson_id, "status": "deleted" if lesson_id in deleted else "not_found"}
+                                     for lesson_id in ids]})
+
+
+class LessonRetrieveUpdateDestroyAPIView(ConditionalGetMixin, SparseQuerysetMixin, QuerysetPermissionMixin,
+                                         TimedPermissionsMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
 
@@ -72,9 +209,11 @@ class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
         return super().get_permissions()
 
 
-class SubscriptionListCreateAPIView(generics.ListCreateAPIView):
+class SubscriptionListCreateAPIView(ConditionalGetMixin, SparseQuerysetMixin, FastListMixin, TimedPermissionsMixin,
+                                    generics.ListCreateAPIView):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
+    pagination_class = SubscriptionPaginator
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -85,7 +224,8 @@ class SubscriptionListCreateAPIView(generics.ListCreateAPIView):
         return get_queryset_for_owner(self.request.user, self.queryset)
 
 
-class SubscriptionRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class SubscriptionRetrieveUpdateDestroyAPIView(ConditionalGetMixin, SparseQuerysetMixin, QuerysetPermissionMixin,
+                                               TimedPermissionsMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
 
@@ -94,4 +234,52 @@ class SubscriptionRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPI
             self.permission_classes = [IsOwner | IsModerator | IsAdminUser]
         elif self.request.method in ["PATCH", "PUT", "DELETE"]:
             self.permission_classes = [IsModerator | IsAdminUser]
-        return super().get_permissions()
\ No newline at end of file
+        return super().get_permissions()
+
+
+class AsyncCourseListView(CourseQuerysetMixin, SparseQuerysetMixin, AsyncListView):
+    """
+    Асинхронный список курсов (ASGI) с теми же полями, сортировкой и размером страницы, что у CourseViewSet
+    """
+    page_size = CoursePaginator.page_size
+    max_page_size = CoursePaginator.max_page_size
+
+
+class AsyncCourseRetrieveView(CourseQuerysetMixin, SparseQuerysetMixin, AsyncRetrieveView):
+    """
+    Асинхронный просмотр курса (ASGI)
+    """
+    permission_classes = [IsOwner | IsModerator | IsAdminUser]
+
+
+class AsyncLessonListView(SparseQuerysetMixin, AsyncListView):
+    """
+    Асинхронный список уроков (ASGI)
+    """
+    queryset = Lesson.objects.all()
+    serializer_class = LessonSerializer
+    page_size = LessonPaginator.page_size
+    max_page_size = LessonPaginator.max_page_size
+
+    def get_queryset(self):
+        return get_queryset_for_owner(self.request.user, self.queryset)
+
+
+class AsyncLessonRetrieveView(SparseQuerysetMixin, AsyncRetrieveView):
+    """
+    Асинхронный просмотр урока (ASGI): права на объект проверяются в запросе к БД
+    """
+    queryset = Lesson.objects.all()
+    serializer_class = LessonSerializer
+    permission_classes = [IsOwner | IsModerator | IsAdminUser]
+
+
+class AsyncSubscriptionListView(SparseQuerysetMixin, AsyncListView):
+    """
+    Асинхронный список подписок (ASGI)
+    """
+    queryset = Subscription.objects.all()
+    serializer_class = SubscriptionSerializer
+
+    def get_queryset(self):
+        return get_queryset_for_owner(self.request.user, self.queryset)
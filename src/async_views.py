@@ -0,0 +1,174 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from src.permissions import UNSUPPORTED, combine_and, get_permission_filter
+from src.timing import timed
+from users.roles import aget_user_roles
+
+
+class AsyncAPIView(View):
+    """
+    Асинхронное представление для чтения под ASGI: JWT-аутентификация, роли пользователя и загрузка данных
+    выполняются без потоков sync_to_async на запрос, поэтому один процесс обслуживает много медленных клиентов.
+    Права проверяются теми же классами разрешений, что и в синхронных представлениях
+    """
+    http_method_names = ["get"]
+    queryset = None
+    serializer_class = None
+    permission_classes = [IsAuthenticated]
+    filter_backends = []
+    www_authenticate = 'Bearer realm="api"'
+
+    async def authenticate(self, request):
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            authenticator = authentication_class()
+            if not hasattr(authenticator, "aauthenticate"):
+                raise ImproperlyConfigured(f"{authentication_class.__name__} не поддерживает async-аутентификацию")
+            result = await authenticator.aauthenticate(request)
+            if result is not None:
+                return result[0]
+        return AnonymousUser()
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    def response(self, data, status=200, headers=None):
+        return JsonResponse(data, status=status, headers=headers, safe=False,
+                            json_dumps_params={"ensure_ascii": False})
+
+    def error(self, exception):
+        headers = {"WWW-Authenticate": self.www_authenticate} if exception.status_code == 401 else None
+        return self.response({"detail": exception.detail}, exception.status_code, headers)
+
+    def permission_denied(self):
+        if not self.request.user.is_authenticated:
+            return self.error(NotAuthenticated())
+        return self.error(PermissionDenied())
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Параметры запроса под именем DRF, чтобы работали фильтры и ?fields= / ?omit=
+        request.query_params = request.GET
+        try:
+            request.user = await self.authenticate(request)
+        except AuthenticationFailed as error:
+            return self.error(error)
+        await aget_user_roles(request.user)
+
+        with timed("permissions"):
+            has_permission = all(permission.has_permission(request, self) for permission in self.get_permissions())
+        if not has_permission:
+            return self.permission_denied()
+        return await super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def filter_queryset(self, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    def get_serializer_class(self):
+        return self.serializer_class
+
+    def get_serializer_context(self):
+        return {"request": self.request, "view": self}
+
+    def get_serializer(self, *args, **kwargs):
+        return self.get_serializer_class()(*args, context=self.get_serializer_context(), **kwargs)
+
+
+class AsyncListView(AsyncAPIView):
+    """
+    Асинхронный вывод списка: количество через acount, страница через асинхронную итерацию.
+    Формат страницы совпадает с CountStrategyMixin; при page_size = None список выводится целиком
+    """
+    page_size = None
+    max_page_size = None
+    page_query_param = "page"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size) if self.max_page_size else page_size
+
+    def get_page_link(self, number, has_page):
+        if not has_page:
+            return None
+        url = self.request.build_absolute_uri()
+        if number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, number)
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page_size = self.page_size and self.get_page_size()
+        if not page_size:
+            objects = [obj async for obj in queryset]
+            return self.response(self.get_serializer(objects, many=True).data)
+
+        try:
+            number = int(request.GET.get(self.page_query_param, 1))
+        except ValueError:
+            number = 0
+        count = await queryset.acount()
+        pages = max(1, -(-count // page_size))
+        if not 1 <= number <= pages:
+            return self.error(NotFound("Неправильная страница"))
+
+        offset = (number - 1) * page_size
+        objects = [obj async for obj in queryset[offset:offset + page_size]]
+        return self.response({
+            "count": count,
+            "count_is_exact": True,
+            "next": self.get_page_link(number + 1, number < pages),
+            "previous": self.get_page_link(number - 1, number > 1),
+            "results": self.get_serializer(objects, many=True).data,
+        })
+
+
+class AsyncRetrieveView(AsyncAPIView):
+    """
+    Асинхронный просмотр объекта: права на объект проверяются в том же запросе к БД,
+    что и загрузка объекта (условие по owner_id из QuerysetPermissionMixin). 404 - объекта нет, 403 - нет прав
+    """
+    lookup_field = "pk"
+
+    def get_object_permission_filter(self):
+        condition = True
+        for permission in self.get_permissions():
+            _, permission_condition = get_permission_filter(permission, self.request, self)
+            if permission_condition is UNSUPPORTED:
+                raise ImproperlyConfigured(f"{type(permission).__name__} нельзя проверить в запросе к БД")
+            condition = combine_and(condition, permission_condition)
+        return condition
+
+    async def get(self, request, *args, **kwargs):
+        with timed("permissions"):
+            condition = self.get_object_permission_filter()
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(condition, Q):
+            queryset = queryset.annotate(has_object_permission=Case(
+                When(condition, then=Value(True)), default=Value(False), output_field=BooleanField()))
+
+        obj = await queryset.filter(**{self.lookup_field: kwargs[self.lookup_field]}).afirst()
+        if obj is None:
+            return self.error(NotFound(f"No {queryset.model._meta.object_name} matches the given query."))
+        if not getattr(obj, "has_object_permission", condition):
+            return self.permission_denied()
+        return await self.retrieve(obj)
+
+    async def retrieve(self, obj):
+        return self.response(self.get_serializer(obj).data)
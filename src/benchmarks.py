@@ -0,0 +1,398 @@
+import json
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from django.contrib.auth.models import Group
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from materials.counters import rebuild_course_counters
+from materials.models import Course, Lesson, Payment, Subscription
+from materials.serializers import LessonSerializer, PaymentSerializer, SubscriptionSerializer
+from src.fastpath import compile_converters, convert_rows
+from src.payment_status import reconcile_sessions
+from users.models import User
+from users.roles import MODERATORS_GROUP
+
+ROLES = ("user", "moderator", "superuser")
+
+DEFAULT_SIZES = (5, 25, 100)
+
+
+def seed_dataset(size, prefix="bench"):
+    """
+    Заполнение БД тестовыми данными заданного размера.
+    Обычному пользователю и второму владельцу создается по size курсов, уроков, подписок и платежей
+    """
+    moderators, _ = Group.objects.get_or_create(name=MODERATORS_GROUP)
+
+    user = User.objects.create(email=f"{prefix}-{size}-user@example.com")
+    other = User.objects.create(email=f"{prefix}-{size}-other@example.com")
+    moderator = User.objects.create(email=f"{prefix}-{size}-moderator@example.com")
+    moderator.groups.add(moderators)
+    superuser = User.objects.create(email=f"{prefix}-{size}-admin@example.com", is_staff=True, is_superuser=True)
+
+    for owner in (user, other):
+        courses = Course.objects.bulk_create(
+            Course(name=f"Курс {number}", description="Описание курса", owner=owner) for number in range(size)
+        )
+        Lesson.objects.bulk_create(
+            Lesson(name=f"Урок {number}", description="Описание урока", course=course, owner=owner,
+                   video_link="https://www.youtube.com/watch")
+            for number, course in enumerate(courses)
+        )
+        Subscription.objects.bulk_create(Subscription(owner=owner, course=course) for course in courses)
+        Payment.objects.bulk_create(
+            Payment(amount=1000, payment_method="transfer_to_account", owner=owner, course=course, status="paid")
+            for course in courses
+        )
+    rebuild_course_counters(Course.objects.filter(owner__in=[user, other]))
+
+    return {
+        "users": {"user": user, "moderator": moderator, "superuser": superuser},
+        "course": user.courses.order_by("id").first(),
+        "lesson": user.lessons.order_by("id").first(),
+        "subscription": user.subscriptions.order_by("id").first(),
+        "payment": user.payments.order_by("id").first(),
+        "user": user,
+    }
+
+
+def delete_dataset(prefix):
+    """
+    Удаление данных, созданных seed_dataset с заданным префиксом
+    """
+    users = User.objects.filter(email__startswith=f"{prefix}-")
+    Course.objects.filter(owner__in=users).delete()
+    Lesson.objects.filter(owner__in=users).delete()
+    users.delete()
+
+
+def get_endpoints(dataset, size):
+    """
+    Список проверяемых эндпоинтов: (название, url, параметры запроса)
+    """
+    page = {"page_size": size}
+    return [
+        ("courses-list", reverse("materials:courses-list"), page),
+        ("courses-detail", reverse("materials:courses-detail", args=[dataset["course"].pk]), {}),
+        ("lessons-list", reverse("materials:lessons"), page),
+        ("lesson-detail", reverse("materials:lesson", args=[dataset["lesson"].pk]), {}),
+        ("subscriptions-list", reverse("materials:subscriptions"), {}),
+        ("subscription-detail", reverse("materials:subscription", args=[dataset["subscription"].pk]), {}),
+        ("payments-list", reverse("users:payments"), {}),
+        ("payment-detail", reverse("users:payment", args=[dataset["payment"].pk]), {}),
+        ("users-list", reverse("users:users"), {}),
+        ("user-detail", reverse("users:user", args=[dataset["user"].pk]), {}),
+    ]
+
+
+def measure(client, url, params=None):
+    """
+    Выполнение GET-запроса с подсчетом запросов к БД, времени ответа и размера ответа
+    """
+    with CaptureQueriesContext(connection) as context:
+        started = time.perf_counter()
+        response = client.get(url, params or {})
+        elapsed = time.perf_counter() - started
+    return {
+        "status": response.status_code,
+        "queries": len(context.captured_queries),
+        "time_ms": round(elapsed * 1000, 3),
+        "response_bytes": len(response.content),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, roles=ROLES):
+    """
+    Замер всех эндпоинтов для каждого размера набора данных и каждой роли пользователя
+    """
+    client = APIClient()
+    results = []
+    for size in sizes:
+        dataset = seed_dataset(size)
+        for role in roles:
+            client.force_authenticate(dataset["users"][role])
+            for endpoint, url, params in get_endpoints(dataset, size):
+                results.append({"endpoint": endpoint, "role": role, "size": size, **measure(client, url, params)})
+        client.force_authenticate(None)
+    return results
+
+
+def find_regressions(results):
+    """
+    Поиск эндпоинтов, у которых количество запросов к БД растет вместе с размером данных
+    """
+    queries = {}
+    for result in results:
+        queries.setdefault((result["endpoint"], result["role"]), []).append((result["size"], result["queries"]))
+
+    regressions = []
+    for (endpoint, role), measurements in queries.items():
+        measurements.sort()
+        smallest = measurements[0][1]
+        for size, count in measurements[1:]:
+            if count > smallest:
+                regressions.append({"endpoint": endpoint, "role": role, "size": size,
+                                    "queries": count, "baseline_queries": smallest})
+    return regressions
+
+
+def measure_serialization(queryset, serializer_class, repeat=3):
+    """
+    Стоимость вывода одной строки (мкс): ModelSerializer и быстрый вывод через values()
+    """
+    columns = [column for _, column, _ in compile_converters(serializer_class())]
+    rows = queryset.count()
+
+    def best_time(render):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def render_serializer():
+        return serializer_class(list(queryset), many=True).data
+
+    def render_fast():
+        return convert_rows(queryset.values(*columns), compile_converters(serializer_class()))
+
+    serializer_time = best_time(render_serializer)
+    fast_time = best_time(render_fast)
+    return {
+        "serializer": serializer_class.__name__,
+        "rows": rows,
+        "serializer_us_per_row": round(serializer_time / rows * 1_000_000, 3),
+        "fast_us_per_row": round(fast_time / rows * 1_000_000, 3),
+        "speedup": round(serializer_time / fast_time, 2),
+    }
+
+
+def run_serialization_benchmarks(size):
+    """
+    Замер стоимости вывода строки для списков уроков, подписок и платежей
+    """
+    dataset = seed_dataset(size, prefix="serialization")
+    owners = [dataset["user"]]
+    return [
+        measure_serialization(Lesson.objects.filter(owner__in=owners).order_by("id"), LessonSerializer),
+        measure_serialization(Subscription.objects.filter(owner__in=owners).order_by("id"), SubscriptionSerializer),
+        measure_serialization(Payment.objects.filter(owner__in=owners).order_by("id"), PaymentSerializer),
+    ]
+
+
+def write_report(path, results, regressions, label=""):
+    """
+    Сохранение результатов замеров в JSON для сравнения между коммитами
+    """
+    report = {
+        "label": label,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+        "regressions": regressions,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def percentile(values, percent):
+    """
+    Перцентиль по методу ближайшего ранга
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def run_concurrently(jobs, concurrency, user):
+    """
+    Выполнение запросов jobs (функции от APIClient) в concurrency потоков.
+    Каждый поток использует свой клиент и соединение с БД; при concurrency=1 запросы выполняются в текущем потоке
+    """
+    results = [None] * len(jobs)
+    indexes = iter(range(len(jobs)))
+    lock = threading.Lock()
+
+    def worker():
+        client = APIClient()
+        client.force_authenticate(user)
+        while True:
+            with lock:
+                index = next(indexes, None)
+            if index is None:
+                break
+            started = time.perf_counter()
+            response = jobs[index](client)
+            results[index] = (time.perf_counter() - started, response)
+
+    def worker_thread():
+        try:
+            worker()
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker_thread) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize_phase(name, results, elapsed, expected_status):
+    """
+    Пропускная способность и перцентили времени ответа этапа нагрузочного теста
+    """
+    timings = [timing * 1000 for timing, _ in results]
+    return {
+        "phase": name,
+        "requests": len(results),
+        "errors": sum(response.status_code != expected_status for _, response in results),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else None,
+        **{f"p{percent}_ms": round(percentile(timings, percent), 3) for percent in (50, 95, 99)},
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def run_payment_benchmark(server, payments=100, concurrency=10):
+    """
+    Нагрузочный тест оплаты через локальную замену stripe (FakeStripeServer):
+    параллельное создание и просмотр платежей, затем сверка статусов сессий.
+    Созданные данные удаляются после замеров
+    """
+    prefix = uuid.uuid4().hex[:8]
+    user = User.objects.create(email=f"payment-bench-{prefix}@example.com")
+    course = Course.objects.create(name=f"Курс {prefix}", owner=user)
+    try:
+        calls_before = server.total_calls
+        data = {"amount": 1000, "payment_method": "cash", "course": course.pk}
+        created, elapsed = run_concurrently(
+            [lambda client: client.post(reverse("users:payments"), data, format="json")] * payments, concurrency, user)
+        create_calls = server.total_calls - calls_before
+        payment_ids = [response.json()["id"] for _, response in created if response.status_code == 201]
+        phases = [summarize_phase("create", created, elapsed, 201)]
+
+        retrieved, elapsed = run_concurrently(
+            [lambda client, pk=pk: client.get(reverse("users:payment", args=[pk])) for pk in payment_ids],
+            concurrency, user)
+        phases.append(summarize_phase("retrieve", retrieved, elapsed, 200))
+
+        for session_id in Payment.objects.filter(pk__in=payment_ids[::2]).values_list("session_id", flat=True):
+            server.set_payment_status(session_id, "paid")
+        calls_before = server.total_calls
+        started = time.perf_counter()
+        checked, updated = reconcile_sessions()
+        reconcile = {"sessions_checked": checked, "payments_updated": updated,
+                     "time_ms": round((time.perf_counter() - started) * 1000, 3),
+                     "outbound_calls": server.total_calls - calls_before}
+    finally:
+        course.delete()
+        user.delete()
+
+    return {
+        "payments": payments,
+        "concurrency": concurrency,
+        "latency_ms": round(server.latency * 1000, 3),
+        "error_rate": server.error_rate,
+        "outbound_calls_per_payment": round(create_calls / payments, 3) if payments else None,
+        "phases": phases,
+        "reconcile": reconcile,
+        "stripe_calls": dict(server.calls),
+    }
+
+
+def get_asgi_endpoints(dataset, size):
+    """
+    Пары (название, синхронный url, асинхронный url) для сравнения представлений под ASGI
+    """
+    course, lesson = dataset["course"].pk, dataset["lesson"].pk
+    page = f"?page_size={size}"
+    return [
+        ("courses-list", reverse("materials:courses-list") + page, reverse("materials:async-courses") + page),
+        ("courses-detail", reverse("materials:courses-detail", args=[course]),
+         reverse("materials:async-course", args=[course])),
+        ("lessons-list", reverse("materials:lessons") + page, reverse("materials:async-lessons") + page),
+        ("lesson-detail", reverse("materials:lesson", args=[lesson]), reverse("materials:async-lesson", args=[lesson])),
+        ("subscriptions-list", reverse("materials:subscriptions"), reverse("materials:async-subscriptions")),
+    ]
+
+
+def get_process_tree(pid):
+    """
+    Процесс и все его дочерние процессы (воркеры uvicorn) по данным /proc
+    """
+    pids = [pid]
+    for current in pids:
+        try:
+            with open(f"/proc/{current}/task/{current}/children", encoding="utf-8") as file:
+                pids.extend(int(child) for child in file.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def read_process_memory(pid):
+    """
+    Текущая (VmRSS) и пиковая (VmHWM) память процесса с дочерними процессами, МБ.
+    Возвращает None, если /proc недоступен
+    """
+    memory = {"VmRSS": 0, "VmHWM": 0}
+    try:
+        for current in get_process_tree(pid):
+            with open(f"/proc/{current}/status", encoding="utf-8") as file:
+                for line in file:
+                    name, _, value = line.partition(":")
+                    if name in memory:
+                        memory[name] += int(value.split()[0])
+    except OSError:
+        return None
+    return {"rss_mb": round(memory["VmRSS"] / 1024, 1), "peak_rss_mb": round(memory["VmHWM"] / 1024, 1)}
+
+
+def run_http_load(url, headers, requests_count, concurrency):
+    """
+    Выполнение requests_count GET-запросов к url в concurrency соединений
+    """
+    local = threading.local()
+
+    def fetch(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+            local.session.headers.update(headers)
+        started = time.perf_counter()
+        response = local.session.get(url)
+        return time.perf_counter() - started, response
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(requests_count)))
+    return results, time.perf_counter() - started
+
+
+def run_asgi_benchmark(base_url, token, endpoints, requests_count=200, concurrency=50, pid=None):
+    """
+    Нагрузочный тест эндпоинтов запущенного ASGI-сервера: пропускная способность и перцентили времени ответа
+    для каждого url из endpoints [(название, url)], память процесса сервера после нагрузки
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    results = []
+    for name, url in endpoints:
+        # Прогрев: соединения с БД, кэш пользователя и ролей
+        run_http_load(base_url + url, headers, concurrency, concurrency)
+        responses, elapsed = run_http_load(base_url + url, headers, requests_count, concurrency)
+        results.append(summarize_phase(name, responses, elapsed, 200))
+    return {"concurrency": concurrency, "phases": results, "memory": read_process_memory(pid) if pid else None}
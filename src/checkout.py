@@ -0,0 +1,91 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from materials.models import Payment
+from src.utils import create_stripe_price, create_stripe_session
+
+logger = logging.getLogger(__name__)
+
+CHECKOUT_MODES = ("sync", "thread", "db")
+
+# Статусы платежа, для которого еще создается сессия оплаты в stripe
+PENDING_STATUSES = ("pending", "processing")
+
+executor = None
+
+
+def create_checkout(payment):
+    """
+    Создание продукта, цены и сессии оплаты в stripe: (id сессии, ссылка на оплату)
+    """
+    return create_stripe_session(create_stripe_price(payment))
+
+
+def get_claimable_payments():
+    """
+    Платежи, ожидающие создания сессии оплаты: в статусе pending или захваченные обработчиком
+    дольше PAYMENT_CHECKOUT_CLAIM_TIMEOUT секунд назад (обработчик завершился, не сохранив результат).
+    Время захвата - updated_at, его выставляет запрос захвата
+    """
+    stale = timezone.now() - timedelta(seconds=settings.PAYMENT_CHECKOUT_CLAIM_TIMEOUT)
+    return Payment.objects.filter(Q(status="pending") | Q(status="processing", updated_at__lt=stale))
+
+
+def process_payment_checkout(payment_id):
+    """
+    Создание сессии оплаты для отложенного платежа.
+    Платеж захватывается сменой статуса на processing одним UPDATE, поэтому обрабатывается одним обработчиком
+    """
+    if not get_claimable_payments().filter(pk=payment_id).update(status="processing", updated_at=timezone.now()):
+        return False
+    payment = Payment.objects.select_related("course", "lesson").get(pk=payment_id)
+    try:
+        payment.session_id, payment.link = create_checkout(payment)
+        payment.status = "unpaid"
+    except stripe.error.StripeError:
+        logger.exception("Не удалось создать сессию оплаты для платежа %s", payment_id)
+        payment.status = "checkout_failed"
+    payment.save(update_fields=["session_id", "link", "status", "updated_at"])
+    return True
+
+
+def process_pending_payments(limit=None):
+    """
+    Обработка отложенных и зависших платежей в порядке создания, возвращает количество обработанных
+    """
+    payment_ids = get_claimable_payments().order_by("id").values_list("id", flat=True)
+    return sum(process_payment_checkout(payment_id) for payment_id in list(payment_ids[:limit]))
+
+
+def run_in_thread(payment_id):
+    try:
+        process_payment_checkout(payment_id)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=settings.PAYMENT_CHECKOUT_WORKERS,
+                                      thread_name_prefix="payment-checkout")
+    return executor
+
+
+def enqueue_payment_checkout(payment):
+    """
+    Постановка отложенного платежа в очередь: thread - пул потоков процесса после фиксации транзакции,
+    db - платеж остается в статусе pending до обработки командой process_pending_payments
+    """
+    if settings.PAYMENT_CHECKOUT_MODE not in CHECKOUT_MODES:
+        raise ImproperlyConfigured(f"PAYMENT_CHECKOUT_MODE должен быть одним из: {', '.join(CHECKOUT_MODES)}")
+    if settings.PAYMENT_CHECKOUT_MODE == "thread":
+        transaction.on_commit(lambda: get_executor().submit(run_in_thread, payment.pk))
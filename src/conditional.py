@@ -0,0 +1,134 @@
+import hashlib
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from src.utils import get_queryset_for_owner
+
+
+class NotModified(Exception):
+    """
+    Прерывание вывода списка до сериализации: валидатор совпал с условным запросом
+    """
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Поддержка условных GET-запросов (If-None-Match / If-Modified-Since) для просмотра объекта и списка.
+    Валидатор объекта вычисляется одним легким запросом до загрузки данных. Валидатор страницы списка
+    строится по уже загруженной странице (id и updated_at строк, количество от пагинатора), поэтому
+    отдельных запросов не требует; при совпадении возвращается 304 Not Modified без сериализации
+    """
+    # Валидатор страницы использует updated_at строк, поэтому колонка загружается и при ?fields=
+    sparse_required_fields = ("updated_at",)
+    is_conditional_list = False
+    list_etag = None
+    # Выдавать Last-Modified для объекта: только если все значения валидатора меняются вместе с updated_at
+    use_last_modified = True
+
+    def get_validator_queryset(self):
+        """
+        Объекты, доступные пользователю для просмотра (владелец, модератор, администратор)
+        """
+        return get_queryset_for_owner(self.request.user, self.queryset)
+
+    def get_object_validator(self):
+        """
+        Значения, от которых зависит представление объекта, или None, если объект недоступен
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_validator_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}).values("updated_at").first()
+
+    def get_list_validator(self, queryset):
+        """
+        Значения, от которых зависит представление списка без пагинации
+        """
+        return queryset.order_by().aggregate(updated_at=Max("updated_at"), total=Count("pk"))
+
+    def get_row_validator(self, row):
+        """
+        Значения, от которых зависит представление строки страницы.
+        Строка values() (быстрый вывод списка) уже содержит все выводимые поля
+        """
+        if isinstance(row, dict):
+            return tuple(sorted(row.items()))
+        return row.pk, row.updated_at
+
+    def get_page_validator(self, page):
+        """
+        Значения, от которых зависит представление страницы: строки, общее количество,
+        посчитанное пагинатором (его способом подсчета), и наличие соседних страниц курсорной пагинации
+        """
+        paginator = getattr(self.paginator, "cursor_paginator", None) or self.paginator
+        page_paginator = getattr(getattr(paginator, "page", None), "paginator", None)
+        return {
+            "rows": [self.get_row_validator(row) for row in page],
+            "total": page_paginator.count if page_paginator is not None else None,
+            "has_next": getattr(paginator, "has_next", None),
+            "has_previous": getattr(paginator, "has_previous", None),
+        }
+
+    def get_etag(self, parts):
+        """
+        ETag по значениям валидатора, адресу запроса и пользователю
+        """
+        source = f"{self.request.get_full_path()}|{self.request.user.pk}|{sorted(parts.items())}"
+        return quote_etag(hashlib.md5(source.encode()).hexdigest())
+
+    def get_validators(self, parts):
+        """
+        ETag и Last-Modified по значениям валидатора объекта
+        """
+        timestamps = [value for value in parts.values() if isinstance(value, datetime)]
+        last_modified = int(max(timestamps).timestamp()) if timestamps and self.use_last_modified else None
+        return self.get_etag(parts), last_modified
+
+    def conditional_response(self, parts, handler, request, *args, **kwargs):
+        if parts is None:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(parts)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(self.get_object_validator(), super().retrieve, request, *args, **kwargs)
+
+    def paginate_queryset(self, queryset):
+        """
+        Проверка условного запроса списка после загрузки страницы, но до сериализации.
+        Last-Modified для списка не выдается: удаление строки не меняет максимальный updated_at
+        """
+        page = super().paginate_queryset(queryset)
+        if self.is_conditional_list:
+            parts = self.get_list_validator(queryset) if page is None else self.get_page_validator(page)
+            self.list_etag = self.get_etag(parts)
+            response = get_conditional_response(self.request, etag=self.list_etag)
+            if response is not None:
+                raise NotModified(response)
+        return page
+
+    def list(self, request, *args, **kwargs):
+        self.is_conditional_list = True
+        try:
+            response = super().list(request, *args, **kwargs)
+        except NotModified as exc:
+            return exc.response
+        finally:
+            self.is_conditional_list = False
+        if response.status_code == 200 and self.list_etag is not None:
+            response["ETag"] = self.list_etag
+        return response
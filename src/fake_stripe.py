@@ -0,0 +1,134 @@
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов к продуктам, ценам и сессиям оплаты в формате API stripe
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Request-Id", f"req_fake_{next(self.server.request_ids)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_params(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return dict(parse_qsl(self.rfile.read(length).decode())) if length else {}
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        params = {**dict(parse_qsl(url.query)), **self.read_params()}
+        route = f"{method} {url.path.rstrip('/')}"
+        server = self.server
+        server.record_call(route)
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            return self.send_json(500, {"error": {"type": "api_error", "message": "Injected error"}})
+
+        if route == "POST /v1/products":
+            return self.send_json(200, server.create("prod", {"object": "product", "name": params.get("name")}))
+        if route == "POST /v1/prices":
+            return self.send_json(200, server.create("price", {
+                "object": "price", "currency": params.get("currency"), "product": params.get("product"),
+                "unit_amount": int(params.get("unit_amount", 0))}))
+        if route == "POST /v1/checkout/sessions":
+            session = server.create("cs_test", {"object": "checkout.session", "payment_status": "unpaid",
+                                                "mode": params.get("mode"), "created": int(time.time())})
+            session["url"] = f"{server.url}/pay/{session['id']}"
+            return self.send_json(200, session)
+        if route == "GET /v1/checkout/sessions":
+            return self.send_json(200, server.list_sessions(int(params.get("limit", 10)),
+                                                            params.get("starting_after")))
+        if route.startswith("GET /v1/checkout/sessions/"):
+            session = server.objects.get(url.path.rsplit("/", 1)[-1])
+            if session is None:
+                return self.send_json(404, {"error": {"type": "invalid_request_error",
+                                                      "message": "No such checkout.session"}})
+            return self.send_json(200, session)
+        return self.send_json(404, {"error": {"type": "invalid_request_error", "message": f"Unknown route {route}"}})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """
+    Локальная замена API stripe для нагрузочных тестов: продукты, цены и сессии оплаты хранятся в памяти.
+    latency и jitter задают задержку ответа (сек), error_rate - долю ответов 500
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0):
+        super().__init__((host, port), FakeStripeHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.objects = {}
+        self.calls = {}
+        self.ids = itertools.count(1)
+        self.request_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_call(self, route):
+        with self.lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+
+    @property
+    def total_calls(self):
+        with self.lock:
+            return sum(self.calls.values())
+
+    def create(self, prefix, data):
+        obj = {"id": f"{prefix}_{next(self.ids)}", **data}
+        with self.lock:
+            self.objects[obj["id"]] = obj
+        return obj
+
+    def set_payment_status(self, session_id, status):
+        with self.lock:
+            self.objects[session_id]["payment_status"] = status
+
+    def list_sessions(self, limit, starting_after=None):
+        with self.lock:
+            sessions = [obj for obj in self.objects.values() if obj["object"] == "checkout.session"]
+        sessions.reverse()
+        if starting_after:
+            ids = [session["id"] for session in sessions]
+            sessions = sessions[ids.index(starting_after) + 1:] if starting_after in ids else []
+        return {"object": "list", "url": "/v1/checkout/sessions", "data": sessions[:limit],
+                "has_more": len(sessions) > limit}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="fake-stripe", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from src.timing import timed
+
+# Поля, представление которых совпадает со значением из БД
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField,
+                   serializers.PrimaryKeyRelatedField)
+
+
+def file_converter(field, model_field):
+    """
+    Преобразование пути к файлу из БД так же, как его выводит FileField/ImageField сериализатора
+    """
+    def convert(value):
+        return field.to_representation(model_field.attr_class(None, model_field, value))
+    return convert
+
+
+def compile_converters(serializer):
+    """
+    Список (поле ответа, колонка БД, преобразование) для сериализатора модели.
+    Возвращает None, если в сериализаторе есть поля, которые нельзя вывести из колонок модели
+    (SerializerMethodField, вложенные сериализаторы, обратные связи)
+    """
+    model = serializer.Meta.model
+    converters = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        if isinstance(field, serializers.FileField):
+            converter = file_converter(field, model_field)
+        elif isinstance(field, IDENTITY_FIELDS):
+            converter = None
+        elif isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField, serializers.Serializer)):
+            return None
+        else:
+            converter = field.to_representation
+        converters.append((name, model_field.attname, converter))
+    return converters
+
+
+def convert_rows(rows, converters):
+    """
+    Строки values() -> словари в формате ответа сериализатора
+    """
+    result = []
+    for row in rows:
+        item = {}
+        for name, column, converter in converters:
+            value = row[column]
+            item[name] = value if converter is None or value is None else converter(value)
+        result.append(item)
+    return result
+
+
+class FastListMixin:
+    """
+    Быстрый вывод списка (настройка FAST_LIST_SERIALIZATION): строки читаются через values()
+    и преобразуются заранее подготовленными функциями полей без создания экземпляров модели.
+    Ответ совпадает с выводом ModelSerializer; если сериализатор не поддерживается, используется обычный путь
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        converters = compile_converters(serializer) if settings.FAST_LIST_SERIALIZATION else None
+        if converters is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = {column for _, column, _ in converters}
+        columns.update(field.lstrip("-") for field in queryset.query.order_by if isinstance(field, str))
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with timed("serializer"):
+                data = convert_rows(page, converters)
+            return self.get_paginated_response(data)
+        rows = list(rows)
+        with timed("serializer"):
+            data = convert_rows(rows, converters)
+        return Response(data)
@@ -0,0 +1,66 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
+FIELDS_QUERY_PARAM = "fields"
+OMIT_QUERY_PARAM = "omit"
+
+
+def get_sparse_fieldset(request):
+    """
+    Наборы полей из параметров запроса ?fields=id,name и ?omit=description
+    """
+    params = getattr(request, "query_params", request.GET)
+
+    def parse(param):
+        return {name.strip() for name in params.get(param, "").split(",") if name.strip()}
+
+    return parse(FIELDS_QUERY_PARAM), parse(OMIT_QUERY_PARAM)
+
+
+def is_field_requested(request, name):
+    """
+    Проверка, что поле попадет в ответ с учетом ?fields= и ?omit=
+    """
+    if request is None:
+        return True
+    requested, omitted = get_sparse_fieldset(request)
+    return (not requested or name in requested) and name not in omitted
+
+
+class SparseFieldsMixin:
+    """
+    Сериализатор, выводящий только поля из ?fields= без полей из ?omit=.
+    Применяется только к сериализатору верхнего уровня, вложенные сериализаторы выводятся целиком
+    """
+
+    def is_root_serializer(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or not self.is_root_serializer():
+            return fields
+        return {name: field for name, field in fields.items() if is_field_requested(request, name)}
+
+
+class SparseQuerysetMixin:
+    """
+    Ограничение загружаемых из БД колонок (only) полями, которые попадут в ответ при ?fields= / ?omit=
+    """
+    # Колонки, которые загружаются всегда: нужны самому представлению, а не ответу
+    sparse_required_fields = ()
+
+    def is_field_requested(self, name):
+        return is_field_requested(self.request, name)
+
+    def get_sparse_queryset(self, queryset):
+        if self.request.method not in SAFE_METHODS or not any(get_sparse_fieldset(self.request)):
+            return queryset
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        sources = {field.source for field in self.get_serializer().fields.values() if field.source in model_fields}
+        return queryset.only(queryset.model._meta.pk.name, *sources, *self.sparse_required_fields)
+
+    def filter_queryset(self, queryset):
+        return self.get_sparse_queryset(super().filter_queryset(queryset))
@@ -0,0 +1,16 @@
+from rest_framework.filters import OrderingFilter
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    Сортировка с уникальным последним ключом: к полям сортировки добавляется id в направлении последнего поля,
+    поэтому строки с одинаковым значением не меняют порядок и не повторяются на соседних страницах
+    """
+    tiebreaker = "id"
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering or any(field.lstrip("-") in (self.tiebreaker, "pk") for field in ordering):
+            return ordering
+        direction = "-" if ordering[-1].startswith("-") else ""
+        return [*ordering, f"{direction}{self.tiebreaker}"]
@@ -0,0 +1,104 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from users.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# Заголовки ответа, которые сохраняются и возвращаются при повторе
+REPLAYED_HEADERS = ("Location",)
+
+
+class IdempotentCreateMixin:
+    """
+    Поддержка заголовка Idempotency-Key для создания объектов.
+    Ключ хранится для пользователя IDEMPOTENCY_KEY_TTL секунд: повтор запроса с тем же ключом возвращает
+    сохраненный ответ без записи в БД и обращений к stripe. Строка ключа в статусе выполнения служит блокировкой:
+    одновременный дубликат ждет завершения первого запроса до idempotency_wait секунд, затем получает 409
+    """
+    idempotency_wait = 5
+    idempotency_poll_interval = 0.1
+
+    def get_request_fingerprint(self, request):
+        source = b"|".join([request.method.encode(), request.path.encode(), request.body])
+        return hashlib.sha256(source).hexdigest()
+
+    def acquire_idempotency_key(self, key, fingerprint):
+        """
+        Захват ключа: (запись, True), если запрос нужно выполнить, или (запись, False) для существующего ключа
+        """
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=self.request.user, key=key, fingerprint=fingerprint,
+                                                     expires_at=expires_at), True
+        except IntegrityError:
+            pass
+        # Просроченный ключ захватывается заново одним UPDATE, поэтому только одним запросом
+        if IdempotencyKey.objects.filter(user=self.request.user, key=key, expires_at__lte=now).update(
+                fingerprint=fingerprint, is_completed=False, response_status=None, response_body=None,
+                response_headers={}, expires_at=expires_at):
+            return IdempotencyKey.objects.get(user=self.request.user, key=key), True
+        return IdempotencyKey.objects.filter(user=self.request.user, key=key).first(), False
+
+    def wait_for_completion(self, record):
+        deadline = time.monotonic() + self.idempotency_wait
+        while record is not None and not record.is_completed and time.monotonic() < deadline:
+            time.sleep(self.idempotency_poll_interval)
+            record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        return record
+
+    def replay(self, record):
+        return Response(record.response_body, status=record.response_status,
+                        headers={**record.response_headers, "Idempotent-Replayed": "true"})
+
+    def create_response(self, request, *args, **kwargs):
+        """
+        Создание объекта под защитой ключа; представление переопределяет метод, чтобы изменить ответ
+        (например, 202 для отложенной обработки), не обходя проверку ключа и сохранение ответа
+        """
+        return super().create(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return self.create_response(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({"detail": "Ключ идемпотентности длиннее 255 символов"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = self.get_request_fingerprint(request)
+        record, acquired = self.acquire_idempotency_key(key, fingerprint)
+        if not acquired:
+            if record is not None and record.fingerprint != fingerprint:
+                return Response({"detail": "Ключ идемпотентности уже использован для другого запроса"},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            record = self.wait_for_completion(record)
+            if record is None or not record.is_completed:
+                return Response({"detail": "Запрос с этим ключом идемпотентности еще выполняется"},
+                                status=status.HTTP_409_CONFLICT, headers={"Retry-After": "1"})
+            return self.replay(record)
+
+        try:
+            response = self.create_response(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+
+        record.is_completed = True
+        record.response_status = response.status_code
+        record.response_body = response.data
+        record.response_headers = {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)}
+        record.save(update_fields=["is_completed", "response_status", "response_body", "response_headers"])
+        return response
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from materials.counters import rebuild_course_counters
+from materials.models import Course, Payment, StripeEvent
+from src.stripe_client import call_stripe
+
+# Статус платежа для событий, в которых он не совпадает с payment_status сессии
+EVENT_STATUSES = {
+    "checkout.session.async_payment_succeeded": "paid",
+    "checkout.session.async_payment_failed": "failed",
+    "checkout.session.expired": "expired",
+}
+
+# Итоговый статус, который не меняется более поздними событиями
+FINAL_STATUS = "paid"
+
+
+def get_event_status(event_type, session):
+    return EVENT_STATUSES.get(event_type) or session["payment_status"]
+
+
+def apply_session_statuses(statuses, batch_size=500):
+    """
+    Обновление статусов платежей по словарю {id сессии: статус}.
+    Сохраняются только изменившиеся строки одним bulk_update, счетчики оплат курсов пересчитываются
+    """
+    if not statuses:
+        return 0
+    payments = Payment.objects.filter(session_id__in=statuses).only("id", "session_id", "status", "course_id")
+    now = timezone.now()
+    changed = []
+    for payment in payments:
+        status = statuses[payment.session_id]
+        if status and payment.status != status and payment.status != FINAL_STATUS:
+            payment.status = status
+            payment.updated_at = now
+            changed.append(payment)
+    Payment.objects.bulk_update(changed, ["status", "updated_at"], batch_size=batch_size)
+
+    course_ids = {payment.course_id for payment in changed if payment.course_id}
+    if course_ids:
+        rebuild_course_counters(Course.objects.filter(pk__in=course_ids))
+    return len(changed)
+
+
+def store_events(events):
+    """
+    Сохранение событий checkout.session.* из webhook; повторно доставленные события пропускаются
+    """
+    StripeEvent.objects.bulk_create([
+        StripeEvent(
+            event_id=event["id"],
+            type=event["type"],
+            session_id=event["data"]["object"]["id"],
+            status=get_event_status(event["type"], event["data"]["object"]),
+            created=datetime.fromtimestamp(event["created"], tz=dt_timezone.utc),
+        )
+        for event in events if event["type"].startswith("checkout.session.")
+    ], ignore_conflicts=True)
+
+
+def apply_pending_events(batch_size=500):
+    """
+    Применение необработанных событий пачками в порядке их создания в stripe:
+    для каждой сессии берется последнее событие пачки. Возвращает количество измененных платежей
+    """
+    updated = 0
+    while True:
+        events = list(StripeEvent.objects.filter(processed=False).order_by("created", "id")[:batch_size])
+        if not events:
+            return updated
+        updated += apply_session_statuses({event.session_id: event.status for event in events}, batch_size)
+        StripeEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed=True)
+
+
+def reconcile_sessions(created_since=None, page_size=100):
+    """
+    Сверка статусов платежей с сессиями stripe: сессии читаются страницами,
+    изменившиеся платежи каждой страницы обновляются одним bulk_update.
+    Возвращает (количество проверенных сессий, количество измененных платежей)
+    """
+    params = {"limit": page_size}
+    if created_since is not None:
+        params["created"] = {"gte": int(created_since.timestamp())}
+    checked = updated = 0
+    page = call_stripe("checkout.sessions.list", params)
+    while True:
+        statuses = {session["id"]: session["payment_status"] for session in page["data"]}
+        checked += len(statuses)
+        updated += apply_session_statuses(statuses, page_size)
+        if not page["has_more"] or not page["data"]:
+            return checked, updated
+        page = call_stripe("checkout.sessions.list", {**params, "starting_after": page["data"][-1]["id"]})
@@ -0,0 +1,108 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import AND, NOT, OR, BasePermission
+
+from src.timing import timed
+
+# Результат, который нельзя выразить фильтром: проверка выполняется обычным способом
+UNSUPPORTED = object()
+
+
+def combine_and(left, right):
+    if left is False or right is False:
+        return False
+    if left is True:
+        return right
+    if right is True:
+        return left
+    return left & right
+
+
+def combine_or(left, right):
+    if left is True or right is True:
+        return True
+    if left is False:
+        return right
+    if right is False:
+        return left
+    return left | right
+
+
+def combine_not(value):
+    return not value if isinstance(value, bool) else ~value
+
+
+def get_permission_filter(permission, request, view):
+    """
+    Пара (has_permission, условие has_object_permission) для разрешения или выражения из разрешений (&, |, ~).
+    Условие - True, False или Q для выборки; UNSUPPORTED, если у разрешения нет get_object_filter
+    """
+    if isinstance(permission, (AND, OR)):
+        left = get_permission_filter(permission.op1, request, view)
+        right = get_permission_filter(permission.op2, request, view)
+        if UNSUPPORTED in (left[1], right[1]):
+            return left[0], UNSUPPORTED
+        if isinstance(permission, AND):
+            return left[0] and right[0], combine_and(left[1], right[1])
+        # OR проверяет объект только у тех операндов, которые прошли has_permission
+        return left[0] or right[0], combine_or(combine_and(left[0], left[1]), combine_and(right[0], right[1]))
+    if isinstance(permission, NOT):
+        has_permission, condition = get_permission_filter(permission.op1, request, view)
+        return not has_permission, condition if condition is UNSUPPORTED else combine_not(condition)
+
+    has_permission = permission.has_permission(request, view)
+    if hasattr(permission, "get_object_filter"):
+        return has_permission, permission.get_object_filter(request, view)
+    if type(permission).has_object_permission is BasePermission.has_object_permission:
+        return has_permission, True
+    return has_permission, UNSUPPORTED
+
+
+class QuerysetPermissionMixin:
+    """
+    Проверка прав на объект внутри запроса, загружающего объект: выражения из разрешений
+    (IsOwner | IsModerator | IsAdminUser) превращаются в условие по owner_id, вычисляемое в SQL.
+    Коды ответа сохраняются: 404 - объекта нет, 403 - объект есть, но недоступен
+    """
+
+    def get_object_permission_filter(self):
+        """
+        Условие доступа ко всем разрешениям представления или UNSUPPORTED
+        """
+        condition = True
+        for permission in self.get_permissions():
+            _, permission_condition = get_permission_filter(permission, self.request, self)
+            if permission_condition is UNSUPPORTED:
+                return UNSUPPORTED
+            condition = combine_and(condition, permission_condition)
+        return condition
+
+    def filter_permitted(self, queryset):
+        """
+        Объекты выборки, на которые у пользователя есть права представления (для массовых операций)
+        """
+        with timed("permissions"):
+            condition = self.get_object_permission_filter()
+        if condition is UNSUPPORTED:
+            raise ImproperlyConfigured("Разрешения представления нельзя выразить условием выборки")
+        if isinstance(condition, Q):
+            return queryset.filter(condition)
+        return queryset if condition else queryset.none()
+
+    def get_object(self):
+        with timed("permissions"):
+            condition = self.get_object_permission_filter()
+        if condition is UNSUPPORTED:
+            return super().get_object()
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(condition, Q):
+            queryset = queryset.annotate(has_object_permission=Case(
+                When(condition, then=Value(True)), default=Value(False), output_field=BooleanField()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        if not getattr(obj, "has_object_permission", condition):
+            self.permission_denied(self.request)
+        return obj
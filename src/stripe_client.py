@@ -0,0 +1,203 @@
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from src.timing import record_timing
+
+logger = logging.getLogger(__name__)
+
+# Время ожидания ответа для отдельных операций, сек (для остальных - STRIPE_READ_TIMEOUT)
+OPERATION_TIMEOUTS = {
+    "checkout.sessions.create": 15,
+    "checkout.sessions.list": 30,
+}
+
+# Ошибки, после которых запрос можно повторить
+RETRYABLE_ERRORS = (stripe.error.APIConnectionError, stripe.error.RateLimitError, stripe.error.APIError)
+
+
+class CircuitOpenError(stripe.error.APIConnectionError):
+    """
+    Stripe недоступен: после серии ошибок запросы отклоняются без обращения к stripe
+    """
+
+
+class CircuitBreaker:
+    """
+    Размыкатель цепи: после failure_threshold ошибок подряд запросы отклоняются reset_timeout секунд,
+    затем пропускается один пробный запрос - при успехе цепь замыкается, при ошибке снова размыкается
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError("Stripe временно недоступен, запрос отклонен")
+            # Пробный запрос: остальные отклоняются, пока он не завершится
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class StripeCallStats:
+    """
+    Количество вызовов, ошибок и время ответа stripe по операциям в пределах процесса
+    """
+
+    def __init__(self):
+        self.operations = {}
+        self.lock = threading.Lock()
+
+    def record(self, operation, elapsed, error=None):
+        elapsed_ms = elapsed * 1000
+        with self.lock:
+            stats = self.operations.setdefault(operation, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["errors"] += error is not None
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        record_timing("stripe", elapsed)
+        logger.debug("stripe %s %.1f ms%s", operation, elapsed_ms, f" ({type(error).__name__})" if error else "")
+
+    def snapshot(self):
+        with self.lock:
+            return {operation: {**stats, "avg_ms": round(stats["total_ms"] / stats["calls"], 3)}
+                    for operation, stats in self.operations.items()}
+
+    def reset(self):
+        with self.lock:
+            self.operations.clear()
+
+
+call_stats = StripeCallStats()
+
+clients = {}
+clients_lock = threading.Lock()
+breaker = None
+
+
+def get_session():
+    """
+    Общая для всех операций сессия requests с пулом keep-alive соединений размером STRIPE_POOL_SIZE
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_client(operation):
+    """
+    Клиент stripe с таймаутом операции; клиенты используют одну сессию и пул соединений
+    """
+    timeout = OPERATION_TIMEOUTS.get(operation, settings.STRIPE_READ_TIMEOUT)
+    with clients_lock:
+        if "session" not in clients:
+            clients["session"] = get_session()
+        if timeout not in clients:
+            clients[timeout] = stripe.StripeClient(
+                settings.STRIPE_API_KEY,
+                http_client=stripe.RequestsClient(timeout=(settings.STRIPE_CONNECT_TIMEOUT, timeout),
+                                                  session=clients["session"]),
+                max_network_retries=0,
+                base_addresses={"api": settings.STRIPE_API_BASE} if settings.STRIPE_API_BASE else None,
+            )
+        return clients[timeout]
+
+
+def get_breaker():
+    global breaker
+    if breaker is None:
+        breaker = CircuitBreaker(settings.STRIPE_BREAKER_FAILURES, settings.STRIPE_BREAKER_RESET_TIMEOUT)
+    return breaker
+
+
+def reset_stripe_client():
+    """
+    Сброс клиентов и размыкателя цепи (после изменения настроек)
+    """
+    global breaker
+    with clients_lock:
+        clients.clear()
+    breaker = None
+    call_stats.reset()
+
+
+def is_retryable(error):
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, stripe.error.APIError) and error.http_status is not None:
+        return error.http_status >= 500
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def get_retry_delay(attempt):
+    """
+    Экспоненциальная пауза перед повтором со случайным разбросом (full jitter)
+    """
+    return random.uniform(0, min(settings.STRIPE_RETRY_MAX_DELAY, settings.STRIPE_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def call_stripe(operation, params=None):
+    """
+    Вызов операции stripe ("prices.create", "checkout.sessions.list", ...) с таймаутом операции,
+    ограниченным числом повторов сетевых ошибок и ошибок 5xx, размыкателем цепи и замером времени ответа.
+    Повторы создания объектов безопасны: все попытки используют один ключ идемпотентности
+    """
+    circuit = get_breaker()
+    circuit.before_call()
+
+    method = get_client(operation).v1
+    for name in operation.split("."):
+        method = getattr(method, name)
+    options = {"idempotency_key": str(uuid.uuid4())} if operation.endswith(".create") else {}
+
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            result = method(params or {}, options)
+        except stripe.error.StripeError as error:
+            call_stats.record(operation, time.perf_counter() - started, error)
+            if not is_retryable(error):
+                # Ошибки запроса (4xx) не означают недоступность stripe
+                circuit.record_success()
+                raise
+            if attempt >= settings.STRIPE_MAX_RETRIES:
+                circuit.record_failure()
+                raise
+            attempt += 1
+            time.sleep(get_retry_delay(attempt))
+            continue
+        call_stats.record(operation, time.perf_counter() - started)
+        circuit.record_success()
+        return result
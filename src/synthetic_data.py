@@ -0,0 +1,158 @@
+import random
+import time
+from bisect import bisect_left
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import connection
+
+from materials.counters import rebuild_course_counters
+from materials.models import PAYMENT_METHODS, Course, Lesson, Payment, Subscription
+from materials.paginators import invalidate_count_cache
+from users.models import User
+from users.roles import MODERATORS_GROUP
+
+# Пароль всех созданных пользователей (для входа при нагрузочных тестах)
+DEFAULT_PASSWORD = "password"
+PAYMENT_AMOUNTS = (990, 1990, 4990, 9990)
+PAYMENT_STATUSES = (("paid", 7), ("unpaid", 3))
+
+
+def get_popularity(count, exponent, rng):
+    """
+    Накопленные веса популярности по закону Ципфа для count объектов в случайном (по rng) порядке
+    """
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(accumulate(weights))
+
+
+def choose(ids, cumulative_weights, rng):
+    """
+    Выбор id с учетом накопленных весов
+    """
+    return ids[bisect_left(cumulative_weights, rng.random() * cumulative_weights[-1])]
+
+
+class DatasetGenerator:
+    """
+    Генератор синтетических данных для нагрузочных тестов: пользователи, модераторы, курсы,
+    уроки (количество на курс - распределение Парето), подписки и платежи (популярность курсов - закон Ципфа).
+    Одинаковые параметры и seed дают одинаковые данные; вставка выполняется пачками через bulk_create
+    """
+
+    def __init__(self, users=1000, moderators=10, courses=100, lessons_per_course=10, max_lessons=1000,
+                 lessons_skew=1.5, popularity_skew=1.1, subscriptions_per_user=3, payments_per_user=2, seed=0,
+                 batch_size=5000, prefix="synthetic", progress=None):
+        self.users = users
+        self.moderators = moderators
+        self.courses = courses
+        self.lessons_per_course = lessons_per_course
+        self.max_lessons = max_lessons
+        self.lessons_skew = lessons_skew
+        self.popularity_skew = popularity_skew
+        self.subscriptions_per_user = subscriptions_per_user
+        self.payments_per_user = payments_per_user
+        self.seed = seed
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.progress = progress
+        self.stats = {}
+
+    def exists(self):
+        return User.objects.filter(email__startswith=f"{self.prefix}-").exists()
+
+    def insert(self, model, objects, return_ids=False):
+        """
+        Вставка объектов из генератора пачками по batch_size; возвращает id созданных объектов при return_ids
+        """
+        started = time.perf_counter()
+        ids = []
+        rows = 0
+        objects = iter(objects)
+        while batch := list(islice(objects, self.batch_size)):
+            created = model.objects.bulk_create(batch)
+            rows += len(created)
+            if return_ids:
+                ids.extend(obj.pk for obj in created)
+        elapsed = time.perf_counter() - started
+        self.stats[model._meta.model_name] = {"rows": rows, "time_s": round(elapsed, 3),
+                                              "rows_per_s": round(rows / elapsed, 1) if elapsed else None}
+        if self.progress:
+            self.progress(model._meta.model_name, self.stats[model._meta.model_name])
+        return ids
+
+    def get_lessons_count(self, rng):
+        """
+        Количество уроков курса: распределение Парето со средним lessons_per_course, не больше max_lessons
+        """
+        scale = self.lessons_per_course * (self.lessons_skew - 1) / self.lessons_skew
+        return min(self.max_lessons, round(scale * rng.paretovariate(self.lessons_skew)))
+
+    def generate_users(self, password):
+        for number in range(self.users):
+            yield User(email=f"{self.prefix}-user-{number}@example.com", password=password,
+                       first_name=f"Пользователь {number}", is_active=True)
+        for number in range(self.moderators):
+            yield User(email=f"{self.prefix}-moderator-{number}@example.com", password=password,
+                       first_name=f"Модератор {number}", is_active=True)
+
+    def generate_courses(self, course_owners):
+        for number, owner_id in enumerate(course_owners):
+            yield Course(name=f"Курс {number}", description=f"Описание курса {number}", owner_id=owner_id)
+
+    def generate_lessons(self, rng, course_ids, course_owners):
+        for course_id, owner_id in zip(course_ids, course_owners):
+            for number in range(self.get_lessons_count(rng)):
+                yield Lesson(name=f"Урок {number}", description="Описание урока", course_id=course_id,
+                             owner_id=owner_id, video_link=f"https://www.youtube.com/watch?v={course_id}-{number}")
+
+    def generate_subscriptions(self, rng, user_ids, course_ids, popularity):
+        for user_id in user_ids:
+            count = rng.randint(0, 2 * self.subscriptions_per_user)
+            for course_id in sorted({choose(course_ids, popularity, rng) for _ in range(count)}):
+                yield Subscription(owner_id=user_id, course_id=course_id, is_active=rng.random() < 0.9)
+
+    def generate_payments(self, rng, user_ids, course_ids, popularity):
+        statuses, weights = zip(*PAYMENT_STATUSES)
+        methods = [method for method, _ in PAYMENT_METHODS]
+        for user_id in user_ids:
+            for _ in range(rng.randint(0, 2 * self.payments_per_user)):
+                yield Payment(owner_id=user_id, course_id=choose(course_ids, popularity, rng),
+                              amount=rng.choice(PAYMENT_AMOUNTS), payment_method=rng.choice(methods),
+                              status=rng.choices(statuses, weights)[0])
+
+    def run(self):
+        """
+        Создание данных; после вставки пересчитываются счетчики курсов и статистика планировщика (Postgres)
+        """
+        rng = random.Random(self.seed)
+        password = make_password(DEFAULT_PASSWORD, salt=f"synthetic{self.seed}")
+
+        ids = self.insert(User, self.generate_users(password), return_ids=True)
+        user_ids, moderator_ids = ids[:self.users], ids[self.users:]
+        moderators, _ = Group.objects.get_or_create(name=MODERATORS_GROUP)
+        Membership = User.groups.through
+        Membership.objects.bulk_create([Membership(user_id=user_id, group_id=moderators.pk)
+                                        for user_id in moderator_ids], batch_size=self.batch_size)
+
+        # Курсы создает небольшая часть пользователей (авторы)
+        authors = user_ids[:max(1, len(user_ids) // 10)] or [None]
+        course_owners = [rng.choice(authors) for _ in range(self.courses)]
+        course_ids = self.insert(Course, self.generate_courses(course_owners), return_ids=True)
+
+        self.insert(Lesson, self.generate_lessons(rng, course_ids, course_owners))
+        if course_ids:
+            popularity = get_popularity(len(course_ids), self.popularity_skew, rng)
+            self.insert(Subscription, self.generate_subscriptions(rng, user_ids, course_ids, popularity))
+            self.insert(Payment, self.generate_payments(rng, user_ids, course_ids, popularity))
+            rebuild_course_counters(Course.objects.filter(pk__gte=min(course_ids), pk__lte=max(course_ids)))
+
+        for model in (Course, Lesson, Subscription, Payment):
+            invalidate_count_cache(model)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for model in (User, Course, Lesson, Subscription, Payment):
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        return self.stats
@@ -0,0 +1,197 @@
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Замеры в порядке вывода в заголовке Server-Timing
+TIMING_NAMES = ("db", "serializer", "permissions", "stripe")
+
+current_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Замеры одного запроса: количество запросов к БД и суммарное время (мс) по видам работы.
+    Вложенные замеры одного вида (сериализатор внутри сериализатора) не учитываются повторно
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.durations = dict.fromkeys(TIMING_NAMES, 0.0)
+        self.active = set()
+
+    def add(self, name, elapsed):
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed * 1000
+
+    @contextmanager
+    def measure(self, name):
+        if name in self.active:
+            yield
+            return
+        self.active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active.discard(name)
+            self.add(name, time.perf_counter() - started)
+
+    def get_total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def get_header(self, total_ms):
+        """
+        Значение заголовка Server-Timing
+        """
+        metrics = [f'db;dur={self.durations["db"]:.1f};desc="{self.queries} queries"']
+        metrics.extend(f"{name};dur={duration:.1f}" for name, duration in self.durations.items()
+                       if name != "db" and duration)
+        metrics.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(metrics)
+
+
+def record_timing(name, elapsed):
+    """
+    Учет времени (сек) в замерах текущего запроса, если запрос замеряется
+    """
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(name, elapsed)
+
+
+@contextmanager
+def timed(name):
+    """
+    Замер времени блока в замерах текущего запроса
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(name):
+        yield
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обертка выполнения запросов к БД (connection.execute_wrappers): количество и время запросов
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.add("db", time.perf_counter() - started)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    """
+    Учет времени вывода объектов сериализатором в замерах запроса
+    """
+
+    def to_representation(self, instance):
+        timings = current_timings.get()
+        if timings is None:
+            return super().to_representation(instance)
+        with timings.measure("serializer"):
+            return super().to_representation(instance)
+
+
+class TimedPermissionsMixin:
+    """
+    Учет времени проверки прав (has_permission и has_object_permission) в замерах запроса
+    """
+
+    def check_permissions(self, request):
+        with timed("permissions"):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed("permissions"):
+            super().check_object_permissions(request, obj)
+
+
+class ServerTimingMiddleware:
+    """
+    Замер количества и времени запросов к БД, времени сериализации, проверки прав и обращений к stripe.
+    Замеряется доля запросов SERVER_TIMING_SAMPLE_RATE; результат выводится в заголовке Server-Timing
+    (SERVER_TIMING_HEADER) и строкой JSON в лог: WARNING для запросов дольше SERVER_TIMING_SLOW_MS
+    или с количеством запросов к БД от SERVER_TIMING_SLOW_QUERIES, остальные - DEBUG
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recorder, dispatch_uid="server_timing_query_recorder")
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def is_sampled(self):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.report(request, response, timings)
+
+    def report(self, request, response, timings):
+        total_ms = timings.get_total_ms()
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.get_header(total_ms)
+
+        is_slow = total_ms >= settings.SERVER_TIMING_SLOW_MS or timings.queries >= settings.SERVER_TIMING_SLOW_QUERIES
+        level = logging.WARNING if is_slow else logging.DEBUG
+        if logger.isEnabledFor(level):
+            data = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "total_ms": round(total_ms, 3),
+                "queries": timings.queries,
+                **{f"{name}_ms": round(duration, 3) for name, duration in timings.durations.items()},
+            }
+            logger.log(level, json.dumps(data, ensure_ascii=False), extra={"timing": data})
+        return response
@@ -0,0 +1,312 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import Group
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from users.models import User
+
+INPUT_FORMATS = ("csv", "jsonl")
+INSERT_METHODS = ("bulk_create", "copy")
+
+# Поля пользователя, которые переносятся из входного файла как есть
+PROFILE_FIELDS = ("first_name", "last_name", "username", "phone_number", "country")
+TRUE_VALUES = ("1", "true", "yes", "да")
+# Сколько ошибок в записях сохраняется для отчета (количество считается полностью)
+MAX_REPORTED_ERRORS = 100
+# Поля, которые не проверяются валидаторами модели: пароль хэшируется отдельно, дата регистрации задается при вставке
+UNCHECKED_FIELDS = ("password", "date_joined")
+
+
+def get_input_format(path, input_format=None):
+    """
+    Формат входного файла: явно заданный или по расширению (.csv, .jsonl/.ndjson)
+    """
+    if input_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        input_format = "jsonl" if extension in (".jsonl", ".ndjson") else extension.lstrip(".")
+    if input_format not in INPUT_FORMATS:
+        raise ImproperlyConfigured(f"Неизвестный формат файла пользователей: {input_format}")
+    return input_format
+
+
+def read_records(path, input_format=None, start=0):
+    """
+    Построчное чтение пользователей из CSV (с заголовком) или JSON Lines.
+    Возвращает пары (номер записи, словарь полей), записи с номером <= start пропускаются
+    """
+    input_format = get_input_format(path, input_format)
+    with open(path, encoding="utf-8", newline="") as file:
+        if input_format == "csv":
+            records = csv.DictReader(file)
+        else:
+            records = (json.loads(line) for line in file if line.strip())
+        for position, record in enumerate(records, start=1):
+            if position > start:
+                yield position, record
+
+
+def parse_groups(value):
+    """
+    Список групп: JSON-массив или строка с названиями через запятую
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [name.strip() for name in value if name and name.strip()]
+
+
+def parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def hash_passwords(passwords, executor=None, workers=1):
+    """
+    Хэширование паролей в пуле процессов (или в текущем процессе без пула).
+    Для None создается непригодный для входа пароль
+    """
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def get_executor(workers):
+    """
+    Пул процессов для хэширования паролей; при workers = 0 пароли хэшируются в текущем процессе
+    """
+    if not workers:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def copy_value(value):
+    """
+    Значение в текстовом формате COPY Postgres
+    """
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_users(users):
+    """
+    Вставка пользователей командой COPY (только Postgres). Идентификаторы созданных объектов не возвращаются
+    """
+    if connection.vendor != "postgresql":
+        raise ImproperlyConfigured("Вставка через COPY поддерживается только для Postgres")
+    fields = [field for field in User._meta.concrete_fields if not field.primary_key]
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    data = "".join(
+        "\t".join(copy_value(field.get_db_prep_save(getattr(user, field.attname), connection)) for field in fields)
+        + "\n" for user in users
+    )
+    sql = f"COPY {connection.ops.quote_name(User._meta.db_table)} ({columns}) FROM STDIN"
+    with connection.cursor() as cursor:
+        if hasattr(cursor.cursor, "copy_expert"):
+            # psycopg2
+            cursor.cursor.copy_expert(sql, StringIO(data))
+        else:
+            # psycopg 3
+            with cursor.cursor.copy(sql) as copy:
+                copy.write(data)
+
+
+def get_groups(names):
+    """
+    Группы по названиям; отсутствующие группы создаются одним запросом
+    """
+    groups = dict(Group.objects.filter(name__in=names).values_list("name", "pk"))
+    missing = set(names) - set(groups)
+    if missing:
+        Group.objects.bulk_create([Group(name=name) for name in missing], ignore_conflicts=True)
+        groups.update(Group.objects.filter(name__in=missing).values_list("name", "pk"))
+    return groups
+
+
+def assign_groups(users, groups_by_email):
+    """
+    Добавление созданных пользователей в группы одним запросом
+    """
+    names = {name for group_names in groups_by_email.values() for name in group_names}
+    if not names:
+        return
+    groups = get_groups(names)
+    user_ids = {user.email: user.pk for user in users if user.pk is not None}
+    if len(user_ids) < len(users):
+        user_ids = dict(User.objects.filter(email__in=list(groups_by_email)).values_list("email", "pk"))
+    Membership = User.groups.through
+    Membership.objects.bulk_create(
+        [Membership(user_id=user_ids[email], group_id=groups[name])
+         for email, group_names in groups_by_email.items() for name in group_names],
+        ignore_conflicts=True,
+    )
+
+
+def build_user(record, password, now):
+    return User(
+        email=record["email"],
+        password=password,
+        is_active=parse_bool(record.get("is_active")),
+        date_joined=now,
+        **{field: record.get(field) or User._meta.get_field(field).get_default() for field in PROFILE_FIELDS},
+    )
+
+
+class ImportState:
+    """
+    Состояние импорта в JSON-файле: номер последней сохраненной записи и счетчики.
+    Записывается после фиксации каждой пачки, поэтому импорт можно продолжить после сбоя
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+        self.stats = {"created": 0, "skipped": 0, "invalid": 0}
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.position = data["position"]
+            self.stats.update(data["stats"])
+        return self
+
+    def save(self, completed=False):
+        if not self.path:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"position": self.position, "stats": self.stats, "completed": completed}, file)
+        os.replace(temporary, self.path)
+
+
+class UserImporter:
+    """
+    Импорт большого количества пользователей: чтение файла потоком, хэширование паролей в пуле процессов,
+    вставка пачками (bulk_create или COPY) и добавление в группы одним запросом на пачку.
+    Пользователи с уже существующим email пропускаются, поэтому повторный запуск безопасен
+    """
+
+    def __init__(self, chunk_size=1000, workers=0, method="bulk_create", state_path=None, progress=None):
+        if method not in INSERT_METHODS:
+            raise ImproperlyConfigured(f"Неизвестный способ вставки пользователей: {method}")
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.method = method
+        self.state = ImportState(state_path)
+        self.progress = progress
+        self.errors = []
+
+    def add_error(self, position, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((position, message))
+
+    def validate(self, position, record):
+        """
+        Нормализованная запись или None, если запись некорректна (ошибка запоминается).
+        Поля проверяются валидаторами модели до вставки: ошибка БД в одной записи откатила бы всю пачку
+        """
+        record = {**record, "email": User.objects.normalize_email((record.get("email") or "").strip())}
+        try:
+            build_user(record, None, None).clean_fields(exclude=UNCHECKED_FIELDS)
+        except ValidationError as error:
+            self.add_error(position, "; ".join(f"{field}: {' '.join(messages)}"
+                                               for field, messages in error.message_dict.items()))
+            return None
+        if record.get("password_hash"):
+            try:
+                identify_hasher(record["password_hash"])
+            except ValueError:
+                self.add_error(position, "Неизвестный формат хэша пароля")
+                return None
+        max_length = Group._meta.get_field("name").max_length
+        if any(len(name) > max_length for name in parse_groups(record.get("groups"))):
+            self.add_error(position, f"Название группы длиннее {max_length} символов")
+            return None
+        return record
+
+    def import_chunk(self, chunk, executor):
+        records = {}
+        for position, record in chunk:
+            record = self.validate(position, record)
+            if record is None:
+                self.state.stats["invalid"] += 1
+            elif record["email"] in records:
+                self.state.stats["skipped"] += 1
+            else:
+                records[record["email"]] = record
+
+        existing = set(User.objects.filter(email__in=list(records)).values_list("email", flat=True))
+        self.state.stats["skipped"] += len(existing)
+        records = [record for email, record in records.items() if email not in existing]
+
+        # Готовые хэши (password_hash) переносятся как есть, открытые пароли хэшируются в пуле процессов
+        passwords = [record.get("password_hash") for record in records]
+        to_hash = [index for index, password in enumerate(passwords) if not password]
+        hashed = hash_passwords([records[index].get("password") or None for index in to_hash], executor, self.workers)
+        for index, password in zip(to_hash, hashed):
+            passwords[index] = password
+
+        now = timezone.now()
+        users = [build_user(record, password, now) for record, password in zip(records, passwords)]
+        with transaction.atomic():
+            if self.method == "copy":
+                copy_users(users)
+            else:
+                users = User.objects.bulk_create(users)
+            assign_groups(users, {record["email"]: parse_groups(record.get("groups")) for record in records})
+        self.state.stats["created"] += len(users)
+        self.state.position = chunk[-1][0]
+        self.state.save()
+
+    def run(self, path, input_format=None, resume=True):
+        """
+        Импорт файла; при resume продолжается с записи, сохраненной в файле состояния
+        """
+        if resume:
+            self.state.load()
+        started = time.perf_counter()
+        start = self.state.position
+        records = read_records(path, input_format, start=start)
+        executor = get_executor(self.workers)
+        try:
+            while chunk := list(islice(records, self.chunk_size)):
+                self.import_chunk(chunk, executor)
+                if self.progress:
+                    self.progress(self.get_report(started, start))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.state.save(completed=True)
+        return self.get_report(started, start)
+
+    def get_report(self, started, start):
+        elapsed = time.perf_counter() - started
+        processed = self.state.position - start
+        return {
+            "position": self.state.position,
+            **self.state.stats,
+            "elapsed_s": round(elapsed, 3),
+            "records_per_s": round(processed / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+        }
@@ -1,17 +1,17 @@
-import stripe
-from django.contrib.auth.models import Group
+from django.conf import settings
+from django.core.cache import cache
 
-from conf.settings import STRIPE_API_KEY
+from materials.models import StripePrice
+from src.stripe_client import call_stripe
+from users.roles import get_user_roles
 
-stripe.api_key = STRIPE_API_KEY
+STRIPE_CURRENCY = "rub"
 
 
 def get_queryset_for_owner(user, queryset):
-    try:
-        if user.is_superuser or user.groups.get(name="Moderators"):
-            return queryset.order_by("id")
-    except Group.DoesNotExist:
-        return queryset.filter(owner=user).order_by("id")
+    if get_user_roles(user).has_full_access:
+        return queryset.order_by("id")
+    return queryset.filter(owner=user).order_by("id")
 
 
 def create_stripe_product(instance):
@@ -20,34 +20,68 @@ def create_stripe_product(instance):
     """
     instance_name = f"Оплата курса {instance.course.name}" if instance.course \
         else f"Оплата урока {instance.lesson.name}"
-    return stripe.Product.create(name=instance_name)
+    return call_stripe("products.create", {"name": instance_name})
+
+
+def get_stripe_price_lookup(instance):
+    """
+    Курс (или урок, если курс не указан), сумма и валюта, для которых переиспользуется цена в stripe
+    """
+    if instance.course_id:
+        return {"course_id": instance.course_id, "amount": instance.amount, "currency": STRIPE_CURRENCY}
+    return {"course": None, "lesson_id": instance.lesson_id, "amount": instance.amount, "currency": STRIPE_CURRENCY}
+
+
+def get_stripe_price_cache_key(course_id, lesson_id, amount, currency):
+    target = f"course:{course_id}" if course_id else f"lesson:{lesson_id}"
+    return f"stripe_price:{target}:{amount}:{currency}"
 
 
 def create_stripe_price(instance):
     """
-    Создание цены в stripe
+    ID цены в stripe для курса или урока платежа.
+    Продукт и цена создаются в stripe только при первой оплате с такой суммой,
+    дальше берутся из кэша (при STRIPE_PRICE_CACHE_TTL > 0) или таблицы StripePrice
     """
-    return stripe.Price.create(
-        currency="rub",
-        unit_amount=instance.amount * 100,
-        product=create_stripe_product(instance).get("id"),
-    )
+    lookup = get_stripe_price_lookup(instance)
+    cache_key = get_stripe_price_cache_key(instance.course_id, instance.lesson_id, instance.amount, STRIPE_CURRENCY)
+    if settings.STRIPE_PRICE_CACHE_TTL:
+        price_id = cache.get(cache_key)
+        if price_id is not None:
+            return price_id
+
+    price_id = StripePrice.objects.filter(**lookup).values_list("price_id", flat=True).first()
+    if price_id is None:
+        product_id = create_stripe_product(instance)["id"]
+        price = call_stripe("prices.create", {"currency": STRIPE_CURRENCY, "unit_amount": instance.amount * 100,
+                                              "product": product_id})
+        # При одновременном создании остается цена, сохраненная первой
+        stripe_price, _ = StripePrice.objects.get_or_create(
+            **lookup, defaults={"product_id": product_id, "price_id": price["id"]})
+        price_id = stripe_price.price_id
+
+    if settings.STRIPE_PRICE_CACHE_TTL:
+        cache.set(cache_key, price_id, settings.STRIPE_PRICE_CACHE_TTL)
+    return price_id
 
 
-def create_stripe_session(price):
+def invalidate_stripe_prices(**filters):
     """
-    Создание сессии на оплату в stripe
+    Удаление сохраненных цен stripe (например, при переименовании курса или урока)
     """
-    session = stripe.checkout.Session.create(
-        success_url="https://127.0.0.1:8000/payments/",
-        line_items=[{"price": price.get("id"), "quantity": 1}],
-        mode="payment",
-    )
-    return session.get("id"), session.get("url")
+    prices = StripePrice.objects.filter(**filters)
+    cache.delete_many([get_stripe_price_cache_key(*row)
+                       for row in prices.values_list("course_id", "lesson_id", "amount", "currency")])
+    prices.delete()
 
 
-def check_session_status(session_id):
+def create_stripe_session(price_id):
     """
-    Уточнение статуса сессии
+    Создание сессии на оплату в stripe
     """
-    return stripe.checkout.Session.retrieve(session_id).get("payment_status")
\ No newline at end of file
+    session = call_stripe("checkout.sessions.create", {
+        "success_url": "https://127.0.0.1:8000/payments/",
+        "line_items": [{"price": price_id, "quantity": 1}],
+        "mode": "payment",
+    })
+    return session["id"], session["url"]
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .roles import TOKEN_VERSION_CLAIM, get_roles_from_claims
+
+USER_CACHE_HITS_KEY = "auth_user_cache:hits"
+USER_CACHE_MISSES_KEY = "auth_user_cache:misses"
+
+
+def get_user_cache_key(user_id, token_version):
+    """
+    Ключ кэша пользователя для аутентификации по id пользователя и версии токена
+    """
+    return f"auth_user:{user_id}:{token_version}"
+
+
+def invalidate_cached_user(user_id, *token_versions):
+    """
+    Удаление пользователя из кэша аутентификации для указанных версий токена
+    """
+    cache.delete_many([get_user_cache_key(user_id, version) for version in set(token_versions)
+                       if version is not None])
+
+
+def increment_counter(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def aincrement_counter(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def get_user_cache_stats():
+    """
+    Количество попаданий и промахов кэша пользователей и доля попаданий
+    """
+    hits = cache.get(USER_CACHE_HITS_KEY, 0)
+    misses = cache.get(USER_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 4) if total else None}
+
+
+def reset_user_cache_stats():
+    cache.delete_many([USER_CACHE_HITS_KEY, USER_CACHE_MISSES_KEY])
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT, доверяющая ролям из claims токена: группы пользователя не запрашиваются из БД.
+    Токен с устаревшей версией (роли пользователя изменились) отклоняется.
+    Настройка JWT_ROLE_CLAIMS_DB_CHECK включает проверку ролей по БД вместо claims.
+    Загруженный пользователь кэшируется на AUTH_USER_CACHE_TTL секунд по id и версии токена
+    """
+
+    def get_user(self, validated_token):
+        return self.apply_claims(self.get_cached_user(validated_token), validated_token)
+
+    def apply_claims(self, user, validated_token):
+        """
+        Проверка версии токена и роли пользователя из claims
+        """
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+            raise InvalidToken("Роли пользователя изменились, токен отозван")
+        roles = get_roles_from_claims(validated_token)
+        if roles is not None and not settings.JWT_ROLE_CLAIMS_DB_CHECK:
+            user._roles = roles
+        return user
+
+    def check_cached_user(self, user, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("Пароль пользователя изменен", code="password_changed")
+        return user
+
+    def get_cached_user(self, validated_token):
+        """
+        Пользователь из кэша или из БД с последующим кэшированием.
+        В кэш попадают только активные пользователи с актуальной версией токена
+        """
+        if not settings.AUTH_USER_CACHE_TTL or api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        key = get_user_cache_key(validated_token[api_settings.USER_ID_CLAIM],
+                                 validated_token.get(TOKEN_VERSION_CLAIM, 0))
+        user = cache.get(key)
+        if user is not None:
+            increment_counter(USER_CACHE_HITS_KEY)
+            return self.check_cached_user(user, validated_token)
+
+        increment_counter(USER_CACHE_MISSES_KEY)
+        user = super().get_user(validated_token)
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) == user.token_version:
+            cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        Асинхронная аутентификация для ASGI-представлений: токен разбирается без обращения к БД,
+        пользователь загружается из кэша или асинхронным ORM
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.apply_claims(await self.aget_cached_user(validated_token), validated_token), validated_token
+
+    async def aget_cached_user(self, validated_token):
+        if not settings.AUTH_USER_CACHE_TTL or api_settings.USER_ID_CLAIM not in validated_token:
+            return await self.aload_user(validated_token)
+
+        key = get_user_cache_key(validated_token[api_settings.USER_ID_CLAIM],
+                                 validated_token.get(TOKEN_VERSION_CLAIM, 0))
+        user = await cache.aget(key)
+        if user is not None:
+            await aincrement_counter(USER_CACHE_HITS_KEY)
+            return self.check_cached_user(user, validated_token)
+
+        await aincrement_counter(USER_CACHE_MISSES_KEY)
+        user = await self.aload_user(validated_token)
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) == user.token_version:
+            await cache.aset(key, user, settings.AUTH_USER_CACHE_TTL)
+        return user
+
+    async def aload_user(self, validated_token):
+        """
+        Асинхронная загрузка пользователя с проверками JWTAuthentication.get_user
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Токен не содержит идентификатор пользователя")
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed("Пользователь не найден", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("Пользователь неактивен", code="user_inactive")
+        return self.check_cached_user(user, validated_token)
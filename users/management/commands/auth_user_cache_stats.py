@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from users.authentication import get_user_cache_stats, reset_user_cache_stats
+
+
+class Command(BaseCommand):
+    """
+    Вывод количества попаданий и промахов кэша пользователей при аутентификации
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Обнулить счетчики после вывода")
+
+    def handle(self, *args, **options):
+
+        stats = get_user_cache_stats()
+        hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate']:.2%}"
+        self.stdout.write(f"Попадания: {stats['hits']}, промахи: {stats['misses']}, доля попаданий: {hit_rate}")
+
+        if options["reset"]:
+            reset_user_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Счетчики обнулены"))
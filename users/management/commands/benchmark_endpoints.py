@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from src.benchmarks import DEFAULT_SIZES, ROLES, find_regressions, run_benchmarks, write_report
+
+
+class Command(BaseCommand):
+    """
+    Замер количества запросов к БД, времени ответа и размера ответа для эндпоинтов materials и users.
+    Тестовые данные создаются внутри транзакции и откатываются после замеров
+    """
+
+    def handle(self, *args, **options):
+
+        with transaction.atomic():
+            results = run_benchmarks(sizes=options["sizes"], roles=options["roles"])
+            transaction.set_rollback(True)
+
+        regressions = find_regressions(results)
+        write_report(options["output"], results, regressions, label=options["label"])
+
+        for result in results:
+            self.stdout.write(f"{result['endpoint']:<22} {result['role']:<10} size={result['size']:<6} "
+                              f"status={result['status']} queries={result['queries']:<4} "
+                              f"time={result['time_ms']}ms bytes={result['response_bytes']}")
+
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(f"{regression['endpoint']} ({regression['role']}): "
+                                  f"{regression['baseline_queries']} -> {regression['queries']} запросов "
+                                  f"при размере {regression['size']}")
+            raise CommandError("Количество запросов к БД растет вместе с размером данных")
+
+        self.stdout.write(self.style.SUCCESS(f"Отчет сохранен в {options['output']}"))
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                            help="Размеры наборов данных")
+        parser.add_argument("--roles", nargs="+", choices=ROLES, default=list(ROLES), help="Роли пользователей")
+        parser.add_argument("--output", default="benchmark_report.json", help="Путь к JSON-отчету")
+        parser.add_argument("--label", default="", help="Метка замера, например хэш коммита")
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from src.benchmarks import run_payment_benchmark
+from src.fake_stripe import FakeStripeServer
+from src.stripe_client import call_stats, reset_stripe_client
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест создания и просмотра платежей с локальной заменой stripe:
+    пропускная способность, перцентили времени ответа и количество обращений к stripe на платеж
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=100, help="Количество создаваемых платежей")
+        parser.add_argument("--concurrency", type=int, default=10, help="Количество параллельных клиентов")
+        parser.add_argument("--latency", type=float, default=50, help="Задержка ответа stripe, мс")
+        parser.add_argument("--jitter", type=float, default=0, help="Случайная добавка к задержке, мс")
+        parser.add_argument("--error-rate", type=float, default=0, help="Доля ответов stripe с ошибкой 500")
+        parser.add_argument("--output", default="", help="Путь к JSON-отчету")
+
+    def handle(self, *args, **options):
+
+        server = FakeStripeServer(latency=options["latency"] / 1000, jitter=options["jitter"] / 1000,
+                                  error_rate=options["error_rate"]).start()
+        try:
+            with override_settings(STRIPE_API_BASE=server.url, STRIPE_API_KEY="sk_test_fake",
+                                   PAYMENT_CHECKOUT_MODE="sync"):
+                reset_stripe_client()
+                report = run_payment_benchmark(server, payments=options["payments"],
+                                               concurrency=options["concurrency"])
+                report["client_stats"] = call_stats.snapshot()
+        finally:
+            reset_stripe_client()
+            server.stop()
+
+        for phase in report["phases"]:
+            self.stdout.write(f"{phase['phase']:<9} requests={phase['requests']} errors={phase['errors']} "
+                              f"rps={phase['throughput_rps']} p50={phase['p50_ms']}ms p95={phase['p95_ms']}ms "
+                              f"p99={phase['p99_ms']}ms")
+        self.stdout.write(f"Обращений к stripe на платеж: {report['outbound_calls_per_payment']}")
+        self.stdout.write(f"Сверка: сессий {report['reconcile']['sessions_checked']}, "
+                          f"обновлено {report['reconcile']['payments_updated']}, {report['reconcile']['time_ms']}ms")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Отчет сохранен в {options['output']}"))
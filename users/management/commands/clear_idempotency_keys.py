@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """
+    Удаление просроченных ключей идемпотентности
+    """
+
+    def handle(self, *args, **options):
+
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {deleted}"))
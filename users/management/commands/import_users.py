@@ -0,0 +1,48 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from src.user_import import INPUT_FORMATS, INSERT_METHODS, UserImporter
+
+
+class Command(BaseCommand):
+    """
+    Импорт пользователей из CSV или JSON Lines (email, password или password_hash, first_name, last_name,
+    username, phone_number, country, is_active, groups) пачками с хэшированием паролей в пуле процессов.
+    После сбоя повторный запуск продолжает импорт с последней сохраненной пачки
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу пользователей")
+        parser.add_argument("--format", choices=INPUT_FORMATS, help="Формат файла (по умолчанию - по расширению)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Количество пользователей в пачке")
+        parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="Количество процессов для хэширования паролей (0 - без пула)")
+        parser.add_argument("--method", choices=INSERT_METHODS, default="bulk_create",
+                            help="Способ вставки: bulk_create или COPY (только Postgres)")
+        parser.add_argument("--state", default="", help="Файл состояния импорта (по умолчанию <path>.progress)")
+        parser.add_argument("--restart", action="store_true", help="Начать импорт заново, не используя состояние")
+
+    def report_progress(self, report):
+        self.stdout.write(f"Обработано записей: {report['position']}, создано: {report['created']}, "
+                          f"пропущено: {report['skipped']}, с ошибками: {report['invalid']}, "
+                          f"{report['records_per_s']} записей/с")
+
+    def handle(self, *args, **options):
+
+        if not os.path.exists(options["path"]):
+            raise CommandError(f"Файл {options['path']} не найден")
+        importer = UserImporter(chunk_size=options["chunk_size"], workers=options["workers"],
+                                method=options["method"], state_path=options["state"] or f"{options['path']}.progress",
+                                progress=self.report_progress)
+        try:
+            report = importer.run(options["path"], input_format=options["format"], resume=not options["restart"])
+        except ImproperlyConfigured as error:
+            raise CommandError(str(error))
+
+        for position, message in report["errors"]:
+            self.stderr.write(f"Запись {position}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Импорт завершен: создано {report['created']}, пропущено {report['skipped']}, "
+            f"с ошибками {report['invalid']} за {report['elapsed_s']} с"))
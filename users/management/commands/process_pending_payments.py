@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.checkout import process_pending_payments
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди отложенных платежей: создание сессий оплаты в stripe для платежей в статусе pending
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Обработать очередь один раз и завершиться")
+        parser.add_argument("--interval", type=float, default=1.0, help="Пауза между проверками очереди, сек")
+        parser.add_argument("--batch-size", type=int, default=100, help="Количество платежей за одну проверку")
+
+    def handle(self, *args, **options):
+
+        while True:
+            processed = process_pending_payments(limit=options["batch_size"])
+            if processed:
+                self.stdout.write(f"Обработано платежей: {processed}")
+            if options["once"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Очередь платежей обработана"))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from src.payment_status import apply_pending_events, reconcile_sessions
+
+
+class Command(BaseCommand):
+    """
+    Сверка статусов платежей с сессиями оплаты stripe и применение необработанных событий webhook
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="Проверять сессии, созданные за последние N дней")
+        parser.add_argument("--page-size", type=int, default=100, help="Количество сессий на странице (до 100)")
+
+    def handle(self, *args, **options):
+
+        events_updated = apply_pending_events()
+        checked, updated = reconcile_sessions(created_since=timezone.now() - timedelta(days=options["days"]),
+                                              page_size=options["page_size"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Проверено сессий: {checked}, обновлено платежей: {updated + events_updated}"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from src.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    """
+    Запуск локальной замены API stripe (продукты, цены, сессии оплаты) для нагрузочных тестов.
+    Приложение направляется на нее настройкой STRIPE_API_BASE
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Адрес")
+        parser.add_argument("--port", type=int, default=12111, help="Порт")
+        parser.add_argument("--latency", type=float, default=0, help="Задержка ответа, мс")
+        parser.add_argument("--jitter", type=float, default=0, help="Случайная добавка к задержке, мс")
+        parser.add_argument("--error-rate", type=float, default=0, help="Доля ответов с ошибкой 500")
+
+    def handle(self, *args, **options):
+
+        server = FakeStripeServer(host=options["host"], port=options["port"], latency=options["latency"] / 1000,
+                                  jitter=options["jitter"] / 1000, error_rate=options["error_rate"])
+        self.stdout.write(self.style.SUCCESS(f"Замена stripe запущена: STRIPE_API_BASE={server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 
@@ -9,6 +10,7 @@ class User(AbstractUser):
     phone_number = models.CharField(max_length=15, verbose_name="Телефон", null=True, blank=True)
     avatar = models.ImageField(upload_to="users/avatars/", verbose_name="Аватар", null=True, blank=True)
     country = models.CharField(max_length=100, verbose_name="Страна", null=True, blank=True)
+    token_version = models.PositiveIntegerField(verbose_name="Версия токена", default=0)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -19,3 +21,26 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Пользователь",
+                             related_name="idempotency_keys")
+    key = models.CharField(max_length=255, verbose_name="Ключ идемпотентности")
+    fingerprint = models.CharField(max_length=64, verbose_name="Отпечаток запроса")
+    is_completed = models.BooleanField(verbose_name="Запрос выполнен", default=False)
+    response_status = models.PositiveSmallIntegerField(verbose_name="Код ответа", null=True, blank=True)
+    response_body = models.JSONField(verbose_name="Тело ответа", encoder=DjangoJSONEncoder, null=True, blank=True)
+    response_headers = models.JSONField(verbose_name="Заголовки ответа", default=dict, blank=True)
+    created_at = models.DateTimeField(verbose_name="Дата создания", auto_now_add=True)
+    expires_at = models.DateTimeField(verbose_name="Срок действия", db_index=True)
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_key_user_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
@@ -1,16 +1,25 @@
+from django.db.models import Q
 from rest_framework.permissions import BasePermission
 
+from .roles import get_user_roles
+
 
 class IsModerator(BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="Moderators").exists()
+        return get_user_roles(request.user).is_moderator
 
 
 class IsOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
         return obj.owner == request.user
 
+    def get_object_filter(self, request, view):
+        return Q(owner_id=request.user.pk) if request.user.is_authenticated else False
+
 
 class IsCurrentUser(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj == request.user
\ No newline at end of file
+        return obj == request.user
+
+    def get_object_filter(self, request, view):
+        return Q(pk=request.user.pk) if request.user.is_authenticated else False
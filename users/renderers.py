@@ -0,0 +1,51 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    """
+    Буфер для csv.writer, возвращающий записанную строку вместо ее сохранения
+    """
+
+    def write(self, value):
+        return value
+
+
+class CSVStreamRenderer(BaseRenderer):
+    """
+    Построчный вывод данных в формате CSV
+    """
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, fields, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return "".join(self.stream(list(data), [list(data.values())])).encode(self.charset)
+        return "".join(self.stream([], data or [])).encode(self.charset)
+
+
+class NDJSONStreamRenderer(BaseRenderer):
+    """
+    Построчный вывод данных в формате NDJSON (один JSON-объект на строку)
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, fields, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = [data]
+        return "".join(json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+                       for item in data or []).encode(self.charset)
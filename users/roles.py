@@ -0,0 +1,99 @@
+from typing import NamedTuple
+
+MODERATORS_GROUP = "Moderators"
+
+# Названия claims с ролями в JWT
+SUPERUSER_CLAIM = "is_superuser"
+STAFF_CLAIM = "is_staff"
+GROUPS_CLAIM = "groups"
+TOKEN_VERSION_CLAIM = "token_version"
+
+
+class UserRoles(NamedTuple):
+    """
+    Роли пользователя: статус администратора, сотрудника и названия групп
+    """
+    is_superuser: bool = False
+    is_staff: bool = False
+    groups: frozenset = frozenset()
+
+    @property
+    def is_moderator(self):
+        return MODERATORS_GROUP in self.groups
+
+    @property
+    def has_full_access(self):
+        """
+        Доступ ко всем объектам, а не только к собственным (администратор или модератор)
+        """
+        return self.is_superuser or self.is_moderator
+
+
+ANONYMOUS_ROLES = UserRoles()
+
+
+def get_user_roles(user):
+    """
+    Роли пользователя, вычисленные одним запросом к БД и запомненные на объекте пользователя,
+    поэтому в рамках запроса разрешения, выборка объектов и выбор сериализатора используют один результат
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_ROLES
+    roles = user.__dict__.get("_roles")
+    if roles is None:
+        roles = UserRoles(
+            is_superuser=user.is_superuser,
+            is_staff=user.is_staff,
+            groups=frozenset(user.groups.values_list("name", flat=True)),
+        )
+        user._roles = roles
+    return roles
+
+
+async def aget_user_roles(user):
+    """
+    Асинхронный вариант get_user_roles для ASGI-представлений
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_ROLES
+    roles = user.__dict__.get("_roles")
+    if roles is None:
+        roles = UserRoles(
+            is_superuser=user.is_superuser,
+            is_staff=user.is_staff,
+            groups=frozenset([name async for name in user.groups.values_list("name", flat=True)]),
+        )
+        user._roles = roles
+    return roles
+
+
+def invalidate_user_roles(user):
+    """
+    Сброс запомненных ролей пользователя
+    """
+    user.__dict__.pop("_roles", None)
+
+
+def add_role_claims(token, user):
+    """
+    Запись ролей пользователя и версии токена в claims JWT
+    """
+    roles = get_user_roles(user)
+    token[SUPERUSER_CLAIM] = roles.is_superuser
+    token[STAFF_CLAIM] = roles.is_staff
+    token[GROUPS_CLAIM] = sorted(roles.groups)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def get_roles_from_claims(token):
+    """
+    Роли пользователя из claims JWT или None, если токен выпущен без них
+    """
+    if GROUPS_CLAIM not in token:
+        return None
+    return UserRoles(
+        is_superuser=bool(token.get(SUPERUSER_CLAIM)),
+        is_staff=bool(token.get(STAFF_CLAIM)),
+        groups=frozenset(token[GROUPS_CLAIM]),
+    )
@@ -1,7 +1,16 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
+from materials.paginators import PaymentCursorPaginator, get_cursor_link
 from materials.serializers import PaymentSerializer
+from src.fieldsets import SparseFieldsMixin
+from src.timing import TimedSerializerMixin
 from .models import User
+from .roles import TOKEN_VERSION_CLAIM, add_role_claims
 
 
 class NewUserSerializer(serializers.ModelSerializer):
@@ -10,16 +19,73 @@ class NewUserSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["email", "username", "first_name", "last_name", "phone_number", "country", "avatar"]
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
-    payments_history = PaymentSerializer(source="payments", many=True)
+def get_latest_payments(user):
+    """
+    Последние USER_PAYMENT_HISTORY_SIZE + 1 платежей пользователя, новые первыми
+    (лишний платеж показывает, что история продолжается). Используется prefetch latest_payments, если он был выполнен.
+    При USER_PAYMENT_HISTORY_SIZE = 0 история не выводится и платежи не загружаются
+    """
+    if not settings.USER_PAYMENT_HISTORY_SIZE:
+        return []
+    if not hasattr(user, "latest_payments"):
+        user.latest_payments = list(user.payments.order_by("-id")[:settings.USER_PAYMENT_HISTORY_SIZE + 1])
+    return user.latest_payments
+
+
+class UserDetailSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    payments_history = serializers.SerializerMethodField()
+    payments_history_next = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ["email", "username", "first_name", "last_name", "phone_number",
-                  "country", "avatar", "payments_history"]
\ No newline at end of file
+                  "country", "avatar", "payments_history", "payments_history_next"]
+
+    def get_payments_history(self, obj):
+        """
+        Последние платежи пользователя, новые первыми
+        """
+        return PaymentSerializer(get_latest_payments(obj)[:settings.USER_PAYMENT_HISTORY_SIZE], many=True).data
+
+    def get_payments_history_next(self, obj):
+        """
+        Ссылка на продолжение истории платежей (курсорная пагинация списка платежей) или None
+        """
+        payments = get_latest_payments(obj)
+        if not payments or len(payments) <= settings.USER_PAYMENT_HISTORY_SIZE:
+            return None
+        url = f"{reverse('users:payments')}?owner={obj.pk}&ordering=-id"
+        request = self.context.get("request")
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        return get_cursor_link(PaymentCursorPaginator, url, payments[settings.USER_PAYMENT_HISTORY_SIZE - 1].pk)
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Выдача пары токенов с ролями пользователя (is_superuser, is_staff, groups) и версией токена в claims
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        return add_role_claims(super().get_token(user), user)
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление access-токена: refresh-токен с устаревшей версией (роли изменились) отклоняется
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        token_version = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).values_list(
+            "token_version", flat=True).first()
+        if token_version is not None and refresh.payload.get(TOKEN_VERSION_CLAIM, 0) != token_version:
+            raise InvalidToken("Роли пользователя изменились, выполните вход заново")
+        return super().validate(attrs)
@@ -0,0 +1,86 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .models import User
+from .roles import invalidate_user_roles
+
+# Поля пользователя, которые попадают в claims JWT
+ROLE_FIELDS = ("is_superuser", "is_staff")
+
+
+def revoke_tokens(user_ids):
+    """
+    Отзыв выданных пользователям токенов увеличением версии токена
+    """
+    if not user_ids:
+        return
+    users = User.objects.filter(pk__in=user_ids)
+    for pk, token_version in users.values_list("pk", "token_version"):
+        invalidate_cached_user(pk, token_version)
+    users.update(token_version=F("token_version") + 1)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сброс ролей пользователя и отзыв его токенов при изменении групп
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove") and pk_set or action == "pre_clear":
+            revoke_tokens([instance.pk])
+            instance.token_version += 1
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_user_roles(instance)
+    elif action in ("post_add", "post_remove"):
+        revoke_tokens(pk_set)
+    elif action == "pre_clear":
+        revoke_tokens(list(instance.user_set.values_list("pk", flat=True)))
+
+
+@receiver(post_init, sender=User)
+def remember_role_fields(sender, instance, **kwargs):
+    """
+    Запоминание статусов администратора и сотрудника и версии токена загруженного пользователя
+    """
+    deferred = instance.get_deferred_fields()
+    if instance.pk is not None and "token_version" not in deferred:
+        instance._loaded_token_version = instance.token_version
+    if instance.pk is not None and not deferred.intersection(ROLE_FIELDS):
+        instance._role_fields = tuple(getattr(instance, field) for field in ROLE_FIELDS)
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_role_change(sender, instance, **kwargs):
+    """
+    Увеличение версии токена при изменении статуса администратора или сотрудника
+    """
+    if instance._state.adding:
+        return
+    previous = getattr(instance, "_role_fields", None)
+    if previous is None:
+        previous = User.objects.filter(pk=instance.pk).values_list(*ROLE_FIELDS).first()
+    current = tuple(getattr(instance, field) for field in ROLE_FIELDS)
+    if previous is not None and previous != current:
+        instance.token_version += 1
+    instance._role_fields = current
+
+
+@receiver(post_save, sender=User)
+def invalidate_roles_on_save(sender, instance, **kwargs):
+    """
+    Сброс ролей пользователя и его копии в кэше аутентификации
+    (изменение статусов, пароля, активности и других полей)
+    """
+    invalidate_user_roles(instance)
+    invalidate_cached_user(instance.pk, instance.token_version, getattr(instance, "_loaded_token_version", None))
+    instance._loaded_token_version = instance.token_version
+
+
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_on_delete(sender, instance, **kwargs):
+    """
+    Удаление пользователя из кэша аутентификации
+    """
+    invalidate_cached_user(instance.pk, instance.token_version, getattr(instance, "_loaded_token_version", None))
@@ -1,3 +1,694 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
 
-# Create your tests here.
\ No newline at end of file
+import stripe
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from materials.models import Course, Payment, StripeEvent
+from src.checkout import process_pending_payments
+from src.stripe_client import CircuitOpenError, call_stripe, reset_stripe_client
+from src.timing import RequestTimings, current_timings
+from src.user_import import UserImporter
+from src.utils import create_stripe_price
+
+from .authentication import get_user_cache_stats
+from .models import IdempotencyKey, User
+from .roles import MODERATORS_GROUP, get_user_roles
+from .serializers import RoleTokenObtainPairSerializer
+from .views import PaymentListCreateAPIView
+
+
+class PaymentTestCase(APITestCase):
+    """
+    Тестирование функционала контроллеров Payment
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        self.user = User.objects.create(email="test@email.com")
+        self.payments = [Payment.objects.create(amount=1000 * number, payment_method="cash", owner=self.user)
+                         for number in range(1, 4)]
+        self.client.force_authenticate(self.user)
+
+    def test_payment_list(self):
+        """
+        Тест вывода списка объектов Payment без пагинации
+        """
+
+        url = reverse("users:payments")
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([payment["id"] for payment in response.json()], [payment.pk for payment in self.payments])
+
+    def test_payment_list_cursor(self):
+        """
+        Тест курсорной пагинации списка объектов Payment
+        """
+
+        url = reverse("users:payments")
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 2, "ordering": "-payment_date"})
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(data["results"]), 2)
+
+        response = self.client.get(data["next"])
+        data = response.json()
+
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["next"])
+
+    def test_payment_export(self):
+        """
+        Тест потоковой выгрузки объектов Payment в CSV и NDJSON с фильтрацией
+        """
+
+        other = User.objects.create(email="other@email.com")
+        Payment.objects.create(amount=500, payment_method="cash", owner=other)
+        Payment.objects.create(amount=700, payment_method="transfer_to_account", owner=self.user)
+
+        url = reverse("users:payments-export")
+        response = self.client.get(url, {"format": "csv", "payment_method": "cash"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(lines[0].split(",")[:2], ["id", "amount"])
+        self.assertEqual([int(line.split(",")[0]) for line in lines[1:]], [payment.pk for payment in self.payments])
+
+        response = self.client.get(url, {"format": "ndjson"})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(row["owner"] == self.user.pk for row in rows))
+
+    def test_payment_list_fast_path(self):
+        """
+        Тест совпадения ответа быстрого вывода списка Payment с выводом сериализатора
+        """
+
+        url = reverse("users:payments")
+        for params in [{}, {"ordering": "-payment_date"}, {"pagination": "cursor", "page_size": 2}]:
+            expected = self.client.get(url, params).content
+            with override_settings(FAST_LIST_SERIALIZATION=True):
+                self.assertEqual(self.client.get(url, params).content, expected)
+
+    def test_payment_create(self):
+        """
+        Тест создания объекта Payment с сессией оплаты в запросе
+        """
+
+        with patch("users.views.create_checkout", return_value=("cs_test", "https://checkout.stripe.com/test")):
+            response = self.client.post(reverse("users:payments"), {"amount": 500, "payment_method": "cash"})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        payment = Payment.objects.get(pk=response.json()["id"])
+        self.assertEqual((payment.owner, payment.session_id, payment.status), (self.user, "cs_test", "unpaid"))
+
+    def test_payment_create_idempotency_key(self):
+        """
+        Тест повтора создания объекта Payment с тем же ключом идемпотентности
+        """
+
+        url = reverse("users:payments")
+        data = {"amount": 500, "payment_method": "cash"}
+        with patch("users.views.create_checkout", return_value=("cs_test", "https://checkout.stripe.com/test")) \
+                as create_checkout:
+            first = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY="payment-1")
+            replay = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY="payment-1")
+            other = self.client.post(url, {**data, "amount": 600}, HTTP_IDEMPOTENCY_KEY="payment-1")
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((replay.status_code, replay.json()), (status.HTTP_201_CREATED, first.json()))
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(create_checkout.call_count, 1)
+        self.assertEqual(Payment.objects.filter(amount=500).count(), 1)
+
+    def test_payment_create_idempotency_key_in_progress(self):
+        """
+        Тест отклонения одновременного дубликата запроса с тем же ключом идемпотентности
+        """
+
+        view = PaymentListCreateAPIView
+        IdempotencyKey.objects.create(user=self.user, key="payment-1", expires_at=timezone.now() + timedelta(hours=1),
+                                      fingerprint=hashlib.sha256(b"POST|/payments/|{}").hexdigest())
+
+        with patch.object(view, "idempotency_wait", 0):
+            response = self.client.post(reverse("users:payments"), {}, format="json",
+                                        HTTP_IDEMPOTENCY_KEY="payment-1")
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_payment_create_deferred_idempotency_key(self):
+        """
+        Тест повтора отложенного создания объекта Payment с тем же ключом идемпотентности
+        """
+
+        url = reverse("users:payments")
+        for amount, mode in ((700, "thread"), (800, "db")):
+            with self.subTest(mode=mode), override_settings(PAYMENT_CHECKOUT_MODE=mode):
+                data = {"amount": amount, "payment_method": "cash"}
+                first = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY=f"payment-{mode}")
+                replay = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY=f"payment-{mode}")
+
+                self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+                self.assertEqual((replay.status_code, replay.json()), (status.HTTP_202_ACCEPTED, first.json()))
+                self.assertEqual((replay["Idempotent-Replayed"], replay["Location"]), ("true", first["Location"]))
+                self.assertEqual(Payment.objects.filter(amount=amount).count(), 1)
+
+    @override_settings(PAYMENT_CHECKOUT_MODE="db")
+    def test_payment_create_deferred(self):
+        """
+        Тест отложенного создания сессии оплаты и проверки статуса объекта Payment
+        """
+
+        response = self.client.post(reverse("users:payments"), {"amount": 500, "payment_method": "cash"})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()["status"], "pending")
+        status_url = response["Location"]
+        response = self.client.get(status_url)
+        self.assertEqual((response.json()["link"], response["Retry-After"]), (None, "1"))
+
+        with patch("src.checkout.create_checkout", return_value=("cs_test", "https://checkout.stripe.com/test")):
+            self.assertEqual(process_pending_payments(), 1)
+
+        response = self.client.get(status_url, {"wait": 1})
+        self.assertEqual(response.json(), {"id": response.json()["id"], "status": "unpaid",
+                                           "link": "https://checkout.stripe.com/test"})
+
+    def test_payment_status_async_wait(self):
+        """
+        Тест ожидания ссылки на оплату в асинхронном представлении статуса объекта Payment
+        """
+
+        payment = Payment.objects.create(amount=500, payment_method="cash", owner=self.user, status="pending")
+        other = Payment.objects.create(amount=500, payment_method="cash", status="pending",
+                                       owner=User.objects.create(email="other@email.com"))
+        headers = {"Authorization": f"Bearer {RoleTokenObtainPairSerializer.get_token(self.user).access_token}"}
+
+        def get(obj, params=None):
+            url = reverse("users:async-payment-status", args=[obj.pk])
+            return async_to_sync(self.async_client.get)(url, params, headers=headers)
+
+        self.assertEqual(get(other).status_code, status.HTTP_404_NOT_FOUND)
+        response = get(payment)
+        self.assertEqual((response.json()["status"], response["Retry-After"]), ("pending", "1"))
+
+        async def checkout_created(delay):
+            await Payment.objects.filter(pk=payment.pk).aupdate(status="unpaid", link="https://checkout.stripe.com/test")
+
+        with patch("users.views.asyncio.sleep", side_effect=checkout_created) as sleep:
+            response = get(payment, {"wait": 10})
+        self.assertEqual(sleep.call_count, 1)
+        self.assertNotIn("Retry-After", response)
+        self.assertEqual(response.json(), {"id": payment.pk, "status": "unpaid",
+                                           "link": "https://checkout.stripe.com/test"})
+
+    @override_settings(PAYMENT_CHECKOUT_CLAIM_TIMEOUT=60)
+    def test_payment_checkout_stale_claim(self):
+        """
+        Тест повторного захвата платежа, оставшегося в статусе processing после сбоя обработчика
+        """
+
+        stale, fresh = [Payment.objects.create(amount=500, payment_method="cash", owner=self.user, status="processing")
+                        for _ in range(2)]
+        Payment.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        with patch("src.checkout.create_checkout", return_value=("cs_test", "https://checkout.stripe.com/test")):
+            self.assertEqual(process_pending_payments(), 1)
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.session_id), ("unpaid", "cs_test"))
+        self.assertEqual(fresh.status, "processing")
+
+    @override_settings(STRIPE_PRICE_CACHE_TTL=3600)
+    @patch("src.utils.call_stripe")
+    def test_stripe_price_reuse(self, call_stripe):
+        """
+        Тест переиспользования продукта и цены stripe для курса и суммы и сброса при переименовании курса
+        """
+
+        call_stripe.side_effect = lambda operation, params: {"id": f"price_{params.get('unit_amount')}"}
+        cache.clear()
+        course = Course.objects.create(name="Тестовый курс")
+        payments = [Payment(amount=amount, course=course) for amount in (1000, 1000, 2000)]
+
+        self.assertEqual([create_stripe_price(payment) for payment in payments],
+                         ["price_100000", "price_100000", "price_200000"])
+        self.assertEqual(call_stripe.call_count, 4)
+
+        cache.clear()
+        self.assertEqual(create_stripe_price(payments[0]), "price_100000")
+        self.assertEqual(call_stripe.call_count, 4)
+
+        course = Course.objects.get(pk=course.pk)
+        course.name = "Новое название"
+        course.save()
+
+        create_stripe_price(Payment(amount=1000, course=course))
+        self.assertEqual(call_stripe.call_count, 6)
+        self.assertEqual(call_stripe.call_args_list[4].args,
+                         ("products.create", {"name": "Оплата курса Новое название"}))
+
+    @override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+    def test_stripe_webhook(self):
+        """
+        Тест обновления статуса платежа по подписанному событию stripe и игнорирования повторной доставки
+        """
+
+        course = Course.objects.create(name="Тестовый курс")
+        payment = Payment.objects.create(amount=1000, payment_method="cash", owner=self.user, course=course,
+                                         session_id="cs_test")
+        payload = json.dumps({"id": "evt_test", "object": "event", "type": "checkout.session.completed",
+                              "created": 1700000000,
+                              "data": {"object": {"id": "cs_test", "payment_status": "paid"}}})
+        timestamp = int(time.time())
+        signature = hmac.new(b"whsec_test", f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        url = reverse("users:payments-webhook")
+
+        response = self.client.post(url, payload, content_type="application/json",
+                                    HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1=0{signature[1:]}")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for _ in range(2):
+            response = self.client.post(url, payload, content_type="application/json",
+                                        HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        payment.refresh_from_db()
+        course.refresh_from_db()
+        self.assertEqual((payment.status, course.paid_payments_count), ("paid", 1))
+        self.assertEqual(StripeEvent.objects.filter(processed=True).count(), 1)
+
+    def test_reconcile_payments(self):
+        """
+        Тест сверки статусов платежей с сессиями stripe постранично
+        """
+
+        Payment.objects.filter(pk__in=[payment.pk for payment in self.payments]).update(session_id=None)
+        for number, payment in enumerate(self.payments):
+            payment.session_id = f"cs_{number}"
+            payment.save()
+        pages = [
+            {"data": [{"id": "cs_0", "payment_status": "paid"}, {"id": "cs_1", "payment_status": "unpaid"}],
+             "has_more": True},
+            {"data": [{"id": "cs_2", "payment_status": "paid"}], "has_more": False},
+        ]
+
+        with patch("src.payment_status.call_stripe", side_effect=pages) as call_stripe:
+            call_command("reconcile_payments", page_size=2, stdout=StringIO())
+
+        self.assertEqual(call_stripe.call_args.args[1]["starting_after"], "cs_1")
+        self.assertEqual(list(Payment.objects.order_by("id").values_list("status", flat=True)),
+                         ["paid", "unpaid", "paid"])
+
+
+class UserTestCase(APITestCase):
+    """
+    Тестирование функционала контроллеров User
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        self.user = User.objects.create(email="test@email.com", country="Россия")
+        self.client.force_authenticate(self.user)
+
+    def test_user_sparse_fields(self):
+        """
+        Тест вывода только запрошенных полей User
+        """
+
+        response = self.client.get(reverse("users:users"), {"fields": "email,country"})
+
+        self.assertEqual(response.json(), [{"email": self.user.email, "country": self.user.country}])
+
+        response = self.client.get(reverse("users:user", args=[self.user.pk]), {"omit": "payments_history"})
+
+        self.assertNotIn("payments_history", response.json())
+
+    @override_settings(USER_PAYMENT_HISTORY_SIZE=2)
+    def test_user_payments_history(self):
+        """
+        Тест ограниченной истории платежей пользователя со ссылкой на продолжение и одной загрузкой пользователя
+        """
+
+        payments = Payment.objects.bulk_create(
+            Payment(amount=100 * number, payment_method="cash", owner=self.user) for number in range(1, 6))
+        Payment.objects.create(amount=1000, payment_method="cash")
+        ids = sorted((payment.pk for payment in payments), reverse=True)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("users:user", args=[self.user.pk]))
+        data = response.json()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([payment["id"] for payment in data["payments_history"]], ids[:2])
+        self.assertEqual(sum('FROM "users_user" ' in query["sql"] for query in context.captured_queries), 1)
+
+        response = self.client.get(data["payments_history_next"])
+
+        self.assertEqual([payment["id"] for payment in response.json()["results"]], ids[2:])
+
+        Payment.objects.filter(pk__in=ids[2:]).delete()
+        response = self.client.get(reverse("users:user", args=[self.user.pk]))
+
+        self.assertIsNone(response.json()["payments_history_next"])
+
+        with override_settings(USER_PAYMENT_HISTORY_SIZE=0):
+            response = self.client.get(reverse("users:user", args=[self.user.pk]))
+
+        self.assertEqual((response.json()["payments_history"], response.json()["payments_history_next"]), ([], None))
+
+
+class UserRolesTestCase(APITestCase):
+    """
+    Тестирование определения ролей пользователя
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        self.moderator = User.objects.create(email="moderator@email.com")
+        self.group = Group.objects.create(name=MODERATORS_GROUP)
+        self.moderator.groups.add(self.group)
+        Course.objects.create(name="Тестовый курс")
+
+    def test_roles_resolved_once_per_request(self):
+        """
+        Тест однократного запроса групп пользователя за время обработки запроса
+        """
+
+        self.client.force_authenticate(self.moderator)
+        url = reverse("materials:courses-detail", args=[Course.objects.get().pk])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([query for query in context.captured_queries if "auth_group" in query["sql"]]), 1)
+
+    def test_roles_invalidated_on_groups_change(self):
+        """
+        Тест сброса ролей при изменении групп пользователя
+        """
+
+        self.assertTrue(get_user_roles(self.moderator).is_moderator)
+
+        self.moderator.groups.remove(self.group)
+
+        self.assertFalse(get_user_roles(self.moderator).is_moderator)
+
+
+class RoleClaimsTestCase(APITestCase):
+    """
+    Тестирование ролей пользователя в claims JWT
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        cache.clear()
+        self.moderator = User.objects.create(email="moderator@email.com")
+        self.moderator.set_password("password")
+        self.moderator.save()
+        self.group = Group.objects.create(name=MODERATORS_GROUP)
+        self.moderator.groups.add(self.group)
+        self.course = Course.objects.create(name="Тестовый курс")
+
+    def login(self):
+        response = self.client.post(reverse("users:login"), {"email": "moderator@email.com", "password": "password"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_role_claims(self):
+        """
+        Тест записи ролей пользователя в access-токен
+        """
+
+        access = AccessToken(self.login()["access"])
+
+        self.assertEqual(access["groups"], [MODERATORS_GROUP])
+        self.assertFalse(access["is_superuser"])
+        self.assertEqual(access["token_version"], User.objects.get(pk=self.moderator.pk).token_version)
+
+    def test_roles_from_claims_without_groups_query(self):
+        """
+        Тест проверки прав по claims токена без запроса групп пользователя
+        """
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login()['access']}")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("materials:courses-detail", args=[self.course.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in context.captured_queries if "auth_group" in query["sql"]])
+
+    def test_tokens_revoked_on_roles_change(self):
+        """
+        Тест отзыва токенов при изменении групп пользователя
+        """
+
+        tokens = self.login()
+        self.moderator.groups.remove(self.group)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.get(reverse("materials:courses-detail", args=[self.course.pk]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials()
+        response = self.client.post(reverse("users:token-refresh"), {"refresh": tokens["refresh"]})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.assertEqual(AccessToken(self.login()["access"])["groups"], [])
+
+    @override_settings(AUTH_USER_CACHE_TTL=300)
+    def test_cached_user(self):
+        """
+        Тест загрузки пользователя из кэша и сброса кэша при изменении пользователя
+        """
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login()['access']}")
+        url = reverse("materials:courses-detail", args=[self.course.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in context.captured_queries if "users_user" in query["sql"]])
+        self.assertEqual(get_user_cache_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+        moderator = User.objects.get(pk=self.moderator.pk)
+        moderator.is_active = False
+        moderator.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(STRIPE_MAX_RETRIES=2, STRIPE_RETRY_BASE_DELAY=0, STRIPE_BREAKER_FAILURES=2,
+                   STRIPE_BREAKER_RESET_TIMEOUT=60)
+class StripeClientTestCase(SimpleTestCase):
+    """
+    Тестирование повторов и размыкателя цепи клиента stripe
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        reset_stripe_client()
+        self.client_mock = Mock()
+        patcher = patch("src.stripe_client.get_client", return_value=self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reset_stripe_client)
+
+    def test_retry_with_same_idempotency_key(self):
+        """
+        Тест повтора сетевой ошибки с тем же ключом идемпотентности
+        """
+
+        create = self.client_mock.v1.prices.create
+        create.side_effect = [stripe.error.APIConnectionError("timeout"), {"id": "price_test"}]
+
+        self.assertEqual(call_stripe("prices.create", {"unit_amount": 100}), {"id": "price_test"})
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(create.call_args_list[0].args[1], create.call_args_list[1].args[1])
+
+    def test_circuit_breaker(self):
+        """
+        Тест отклонения запросов без обращения к stripe после серии ошибок
+        """
+
+        retrieve = self.client_mock.v1.checkout.sessions.retrieve
+        retrieve.side_effect = stripe.error.APIError("unavailable", http_status=503)
+        for _ in range(2):
+            with self.assertRaises(stripe.error.APIError):
+                call_stripe("checkout.sessions.retrieve", {"session": "cs_test"})
+
+        with self.assertRaises(CircuitOpenError):
+            call_stripe("checkout.sessions.retrieve", {"session": "cs_test"})
+        self.assertEqual(retrieve.call_count, 6)
+
+    def test_stripe_time_in_request_timings(self):
+        """
+        Тест учета времени всех попыток обращения к stripe в замерах текущего запроса
+        """
+
+        create = self.client_mock.v1.prices.create
+        create.side_effect = [stripe.error.APIConnectionError("timeout"), {"id": "price_test"}]
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            call_stripe("prices.create", {"unit_amount": 100})
+        finally:
+            current_timings.reset(token)
+
+        self.assertGreater(timings.durations["stripe"], 0)
+        self.assertIn("stripe;dur=", timings.get_header(timings.get_total_ms()))
+
+
+class PaymentBenchmarkTestCase(APITestCase):
+    """
+    Тестирование нагрузочного теста оплаты с локальной заменой stripe
+    """
+
+    def test_payment_benchmark(self):
+        """
+        Тест создания, просмотра и сверки платежей через локальную замену stripe
+        """
+
+        cache.clear()
+        with TemporaryDirectory() as directory:
+            output = os.path.join(directory, "report.json")
+            call_command("benchmark_payments", payments=3, concurrency=1, latency=0, output=output,
+                         stdout=StringIO())
+            with open(output, encoding="utf-8") as file:
+                report = json.load(file)
+
+        self.assertEqual([(phase["phase"], phase["errors"]) for phase in report["phases"]],
+                         [("create", 0), ("retrieve", 0)])
+        # Продукт и цена создаются только для первого платежа
+        self.assertEqual(report["outbound_calls_per_payment"], round(5 / 3, 3))
+        self.assertEqual(report["reconcile"]["payments_updated"], 2)
+        self.assertFalse(Payment.objects.exists())
+
+
+class UserImportTestCase(APITestCase):
+    """
+    Тестирование импорта пользователей командой import_users
+    """
+
+    def setUp(self):
+        """
+        Подготовка исходных данных
+        """
+
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        User.objects.create(email="existing@example.com", first_name="Старое имя")
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_import_users_csv(self):
+        """
+        Тест импорта из CSV: хэширование паролей, группы, пропуск существующих и некорректных записей
+        """
+
+        path = self.write("users.csv", "email,password,first_name,country,groups\n"
+                                       "first@example.com,secret1,Иван,Россия,\"Moderators,Students\"\n"
+                                       "existing@example.com,secret2,Новое имя,,\n"
+                                       "not-an-email,secret3,,,\n"
+                                       "second@Example.COM,,Петр,,Students\n")
+
+        call_command("import_users", path, "--workers", "0", "--chunk-size", "2", stdout=StringIO(),
+                     stderr=StringIO())
+
+        first = User.objects.get(email="first@example.com")
+        self.assertTrue(first.check_password("secret1"))
+        self.assertEqual((first.first_name, first.country), ("Иван", "Россия"))
+        self.assertEqual(set(first.groups.values_list("name", flat=True)), {"Moderators", "Students"})
+        second = User.objects.get(email="second@example.com")
+        self.assertFalse(second.has_usable_password())
+        self.assertEqual(list(second.groups.values_list("name", flat=True)), ["Students"])
+        self.assertEqual(User.objects.get(email="existing@example.com").first_name, "Старое имя")
+        with open(f"{path}.progress", encoding="utf-8") as file:
+            self.assertEqual(json.load(file), {"position": 4, "completed": True,
+                                               "stats": {"created": 2, "skipped": 1, "invalid": 1}})
+
+    def test_import_users_resume(self):
+        """
+        Тест продолжения импорта JSON Lines с сохраненной позиции (пароли хэшируются в пуле процессов)
+        """
+
+        path = self.write("users.jsonl", "\n".join(json.dumps(record) for record in [
+            {"email": "first@example.com", "password": "secret1"},
+            {"email": "second@example.com", "password": "secret2", "groups": ["Students"]},
+            {"email": "third@example.com", "password_hash": make_password("secret3"), "is_active": False},
+        ]))
+        self.write("users.jsonl.progress", json.dumps({"position": 1, "completed": False,
+                                                       "stats": {"created": 1, "skipped": 0, "invalid": 0}}))
+
+        call_command("import_users", path, "--workers", "2", stdout=StringIO())
+
+        self.assertFalse(User.objects.filter(email="first@example.com").exists())
+        self.assertTrue(User.objects.get(email="second@example.com").check_password("secret2"))
+        third = User.objects.get(email="third@example.com")
+        self.assertEqual((third.check_password("secret3"), third.is_active), (True, False))
+
+    def test_import_users_invalid_fields(self):
+        """
+        Тест пропуска записей с некорректными полями без отката остальных записей пачки
+        """
+
+        path = self.write("users.jsonl", "\n".join(json.dumps(record) for record in [
+            {"email": "first@example.com", "password": "secret1"},
+            {"email": "long@example.com", "username": "x" * 26},
+            {"email": "hash@example.com", "password_hash": "unknown$hash"},
+            {"email": "second@example.com", "phone_number": "+79000000000"},
+        ]))
+
+        report = UserImporter(chunk_size=4, state_path=f"{path}.progress").run(path)
+
+        emails = set(User.objects.filter(email__endswith="@example.com").values_list("email", flat=True))
+        self.assertEqual(emails, {"existing@example.com", "first@example.com", "second@example.com"})
+        self.assertEqual((report["created"], report["invalid"]), (2, 2))
+        self.assertEqual([position for position, _ in report["errors"]], [2, 3])
@@ -4,6 +4,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from . import views
 from .apps import UsersConfig
+from .serializers import RoleTokenObtainPairSerializer, RoleTokenRefreshSerializer
 
 app_name = UsersConfig.name
 
@@ -11,9 +12,16 @@ urlpatterns = [
     path("users/", views.UserListCreateAPIView.as_view(), name="users"),
     path("users/<int:pk>/", views.UserRetrieveUpdateDestroyAPIView.as_view(), name="user"),
 
-    path('login/', TokenObtainPairView.as_view(permission_classes=[AllowAny]), name='login'),
-    path('token/refresh/', TokenRefreshView.as_view(permission_classes=[AllowAny]), name='token-refresh'),
+    path('login/', TokenObtainPairView.as_view(permission_classes=[AllowAny],
+                                               serializer_class=RoleTokenObtainPairSerializer), name='login'),
+    path('token/refresh/', TokenRefreshView.as_view(permission_classes=[AllowAny],
+                                                    serializer_class=RoleTokenRefreshSerializer),
+         name='token-refresh'),
 
     path("payments/", views.PaymentListCreateAPIView.as_view(), name="payments"),
+    path("payments/export/", views.PaymentExportAPIView.as_view(), name="payments-export"),
+    path("payments/webhook/", views.StripeWebhookAPIView.as_view(), name="payments-webhook"),
     path("payments/<int:pk>/", views.PaymentRetrieveUpdateDestroyAPIView.as_view(), name="payment"),
+    path("payments/<int:pk>/status/", views.PaymentStatusAPIView.as_view(), name="payment-status"),
+    path("async/payments/<int:pk>/status/", views.AsyncPaymentStatusView.as_view(), name="async-payment-status"),
 ]
\ No newline at end of file
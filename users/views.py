@@ -1,16 +1,38 @@
+import asyncio
+import time
+
+import stripe
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics
-from rest_framework.filters import OrderingFilter
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from materials.models import Payment
-from src.utils import get_queryset_for_owner, check_session_status, create_stripe_price, create_stripe_session
+from materials.paginators import PaymentPaginator
+from materials.serializers import PaymentStatusSerializer
+from src.conditional import ConditionalGetMixin
+from src.fastpath import FastListMixin
+from src.filters import StableOrderingFilter
+from src.fieldsets import SparseQuerysetMixin, is_field_requested
+from src.idempotency import IdempotentCreateMixin
+from src.permissions import QuerysetPermissionMixin
+from src.async_views import AsyncRetrieveView
+from src.checkout import PENDING_STATUSES, create_checkout, enqueue_payment_checkout
+from src.payment_status import apply_pending_events, store_events
+from src.timing import TimedPermissionsMixin
+from src.utils import get_queryset_for_owner
 from .models import User
 from .serializers import PaymentSerializer, UserSerializer, NewUserSerializer, UserDetailSerializer
 from rest_framework.permissions import AllowAny, IsAdminUser
 from .permissions import IsCurrentUser, IsModerator, IsOwner
+from .renderers import CSVStreamRenderer, NDJSONStreamRenderer
 
 
-class UserListCreateAPIView(generics.ListCreateAPIView):
+class UserListCreateAPIView(SparseQuerysetMixin, TimedPermissionsMixin, generics.ListCreateAPIView):
     """
     Дженерик для отображения списка и создания нового объекта User:
     """
@@ -42,7 +64,7 @@ class UserListCreateAPIView(generics.ListCreateAPIView):
         user.save()
 
 
-class UserRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class UserRetrieveUpdateDestroyAPIView(TimedPermissionsMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Дженерик для просмотра, редактирования и удаления объекта User:
     """
@@ -51,12 +73,28 @@ class UserRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_serializer_class(self):
         """
-        Подбор сериализатора в зависимости от статуса пользователя
+        Подбор сериализатора в зависимости от статуса пользователя (по pk из url, без повторной загрузки объекта)
         """
-        if self.request.user.is_superuser or self.request.user == self.get_object():
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if self.request.user.is_superuser or (pk is not None and str(self.request.user.pk) == str(pk)):
             return UserDetailSerializer
         return UserSerializer
 
+    def get_queryset(self):
+        """
+        Последние платежи для истории загружаются вместе с пользователем одним дополнительным запросом
+        """
+        queryset = super().get_queryset()
+        history_requested = (is_field_requested(self.request, "payments_history")
+                             or is_field_requested(self.request, "payments_history_next"))
+        if (self.request.method != "DELETE" and settings.USER_PAYMENT_HISTORY_SIZE
+                and self.get_serializer_class() is UserDetailSerializer and history_requested):
+            queryset = queryset.prefetch_related(Prefetch(
+                "payments", queryset=Payment.objects.order_by("-id")[:settings.USER_PAYMENT_HISTORY_SIZE + 1],
+                to_attr="latest_payments",
+            ))
+        return queryset
+
     def get_permissions(self):
         """
         Выдача разрешений в зависимости от статуса пользователя
@@ -68,15 +106,17 @@ class UserRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
         return super().get_permissions()
 
 
-class PaymentListCreateAPIView(generics.ListCreateAPIView):
+class PaymentListCreateAPIView(ConditionalGetMixin, SparseQuerysetMixin, FastListMixin, IdempotentCreateMixin,
+                               TimedPermissionsMixin, generics.ListCreateAPIView):
     """
     Дженерик для отображения списка и создания нового объекта Payment:
     """
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
-    ordering_fields = ["payment_date"]
-    filterset_fields = ["course", "lesson", "payment_method"]
+    pagination_class = PaymentPaginator
+    filter_backends = [DjangoFilterBackend, StableOrderingFilter]
+    ordering_fields = ["id", "payment_date"]
+    filterset_fields = ["owner", "course", "lesson", "payment_method"]
 
     def get_queryset(self):
         """
@@ -84,21 +124,129 @@ class PaymentListCreateAPIView(generics.ListCreateAPIView):
         """
         return get_queryset_for_owner(self.request.user, self.queryset)
 
+    def create_response(self, request, *args, **kwargs):
+        """
+        В режимах thread и db (настройка PAYMENT_CHECKOUT_MODE) платеж сохраняется в статусе pending,
+        сессия оплаты создается в фоне, а ответ 202 содержит адрес для проверки статуса.
+        Метод вызывается из IdempotentCreateMixin.create, поэтому ключ идемпотентности действует во всех режимах
+        """
+        if settings.PAYMENT_CHECKOUT_MODE == "sync":
+            return super().create_response(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payment = serializer.save(owner=request.user, status="pending")
+        enqueue_payment_checkout(payment)
+
+        status_url = request.build_absolute_uri(reverse("users:payment-status", args=[payment.pk]))
+        return Response({**serializer.data, "status_url": status_url}, status=status.HTTP_202_ACCEPTED,
+                        headers={"Location": status_url})
+
     def perform_create(self, serializer):
         """
-        Сохранение владельца при создании объекта
+        Создание сессии оплаты и сохранение объекта с владельцем одним запросом
         """
-        payment = serializer.save()
-        payment.owner = self.request.user
-        price = create_stripe_price(payment)
+        session_id, link = create_checkout(Payment(**serializer.validated_data))
+        serializer.save(owner=self.request.user, session_id=session_id, link=link)
+
+
+def get_status_wait(request, max_wait):
+    """
+    Время ожидания ссылки на оплату из параметра ?wait=N, не больше max_wait секунд
+    """
+    try:
+        return max(min(float(request.query_params.get("wait", 0)), max_wait), 0)
+    except ValueError:
+        return 0
 
-        session_id, payment_link = create_stripe_session(price)
-        payment.session_id = session_id
-        payment.link = payment_link
-        payment.save()
 
+class PaymentStatusAPIView(TimedPermissionsMixin, generics.RetrieveAPIView):
+    """
+    Дженерик для проверки статуса создания сессии оплаты объекта Payment без обращения к stripe.
+    Параметр ?wait=N ожидает до N секунд (не больше PAYMENT_STATUS_MAX_WAIT), пока ссылка на оплату
+    не будет создана; если платеж еще обрабатывается, ответ содержит Retry-After.
+    Ожидание занимает синхронный обработчик, для долгого опроса - AsyncPaymentStatusView
+    """
+    queryset = Payment.objects.all()
+    serializer_class = PaymentStatusSerializer
+    poll_interval = 0.5
+    retry_after = 1
+
+    def get_queryset(self):
+        return get_queryset_for_owner(self.request.user, self.queryset).only("id", "status", "link")
+
+    def get_object(self):
+        payment = super().get_object()
+        deadline = time.monotonic() + get_status_wait(self.request, settings.PAYMENT_STATUS_MAX_WAIT)
+        while payment.status in PENDING_STATUSES and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            payment.refresh_from_db(fields=["status", "link"])
+        return payment
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data["status"] in PENDING_STATUSES:
+            response["Retry-After"] = str(self.retry_after)
+        return response
 
-class PaymentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+
+class AsyncPaymentStatusView(AsyncRetrieveView):
+    """
+    Асинхронная проверка статуса сессии оплаты (ASGI): ожидание ?wait=N (не больше PAYMENT_STATUS_ASYNC_MAX_WAIT)
+    идет через asyncio.sleep и не занимает обработчик, поэтому подходит для долгого опроса
+    """
+    queryset = Payment.objects.only("id", "status", "link")
+    serializer_class = PaymentStatusSerializer
+    poll_interval = PaymentStatusAPIView.poll_interval
+    retry_after = PaymentStatusAPIView.retry_after
+
+    def get_queryset(self):
+        return get_queryset_for_owner(self.request.user, self.queryset)
+
+    async def retrieve(self, obj):
+        deadline = time.monotonic() + get_status_wait(self.request, settings.PAYMENT_STATUS_ASYNC_MAX_WAIT)
+        while obj.status in PENDING_STATUSES and time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            await obj.arefresh_from_db(fields=["status", "link"])
+        headers = {"Retry-After": str(self.retry_after)} if obj.status in PENDING_STATUSES else None
+        return self.response(self.get_serializer(obj).data, headers=headers)
+
+
+class PaymentExportAPIView(TimedPermissionsMixin, generics.GenericAPIView):
+    """
+    Дженерик для потоковой выгрузки списка объектов Payment в CSV (?format=csv) или NDJSON (?format=ndjson):
+    """
+    queryset = Payment.objects.all()
+    renderer_classes = [CSVStreamRenderer, NDJSONStreamRenderer]
+    filter_backends = PaymentListCreateAPIView.filter_backends
+    ordering_fields = PaymentListCreateAPIView.ordering_fields
+    filterset_fields = PaymentListCreateAPIView.filterset_fields
+    export_fields = ["id", "amount", "payment_method", "payment_date", "owner", "course", "lesson",
+                     "status", "session_id", "link"]
+    chunk_size = 2000
+
+    def get_queryset(self):
+        """
+        Подбор списка объектов в зависимости от статуса пользователя
+        """
+        return get_queryset_for_owner(self.request.user, self.queryset)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Построчная выгрузка без создания экземпляров модели: значения читаются серверным курсором
+        порциями по chunk_size строк, поэтому расход памяти не зависит от объема выгрузки
+        """
+        rows = self.filter_queryset(self.get_queryset()).values_list(*self.export_fields).iterator(
+            chunk_size=self.chunk_size)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(renderer.stream(self.export_fields, rows),
+                                         content_type=f"{renderer.media_type}; charset={renderer.charset}")
+        response["Content-Disposition"] = f'attachment; filename="payments.{renderer.format}"'
+        return response
+
+
+class PaymentRetrieveUpdateDestroyAPIView(ConditionalGetMixin, SparseQuerysetMixin, QuerysetPermissionMixin,
+                                          TimedPermissionsMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Дженерик для просмотра, редактирования и удаления объекта Payment:
     """
@@ -115,12 +263,22 @@ class PaymentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
             self.permission_classes = [IsModerator | IsAdminUser]
         return super().get_permissions()
 
-    def get_object(self):
-        """
-        Уточнение статуса для неоплаченного платежа при обращении к объекту
-        """
-        payment = super().get_object()
-        if payment.session_id and payment.status == "unpaid":
-            payment.status = check_session_status(payment.session_id)
-            payment.save()
-        return payment
\ No newline at end of file
+
+class StripeWebhookAPIView(TimedPermissionsMixin, APIView):
+    """
+    Прием событий checkout.session.* от stripe: подпись проверяется секретом STRIPE_WEBHOOK_SECRET,
+    событие сохраняется один раз (повторная доставка игнорируется), статусы платежей обновляются пачкой
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            event = stripe.Webhook.construct_event(request.body, request.headers.get("Stripe-Signature"),
+                                                   settings.STRIPE_WEBHOOK_SECRET)
+        except (ValueError, stripe.error.SignatureVerificationError):
+            return Response({"detail": "Неверная подпись события"}, status=status.HTTP_400_BAD_REQUEST)
+
+        store_events([event])
+        apply_pending_events()
+        return Response({"received": True})